@@ -1,3 +1,4 @@
+import hashlib
 import json
 
 from django.conf.urls import url
@@ -8,11 +9,16 @@ from django.forms import Media
 from django.http import HttpResponse
 from django.template.loader import render_to_string
 from django.views.generic import TemplateView
-from django.http import HttpResponseNotFound
+from django.http import (
+    HttpResponseBadRequest, HttpResponseNotAllowed, HttpResponseNotFound,
+)
+from django.utils.cache import get_conditional_response, patch_cache_control
 
+from .cache import introspection_cache
 from .compat import text_type
-from .exceptions import DjangoQLError
-from .queryset import apply_search
+from .exceptions import DjangoQLError, DjangoQLSchemaError
+from .precompile import load_compiled_schema
+from .queryset import build_filter, needs_distinct, parse_search
 from .schema import DjangoQLSchema
 
 try:
@@ -40,6 +46,11 @@ class DjangoQLSearchMixin(object):
     djangoql_completion = True
     djangoql_schema = DjangoQLSchema
     djangoql_syntax_help_template = 'djangoql/syntax_help.html'
+    djangoql_suggestions_batch_size = 50
+    djangoql_inline_options = True
+    # Seconds browsers may use the schema without revalidation. None means
+    # "no-cache", since inline options and new fields would be served stale
+    djangoql_introspection_max_age = None
 
     def search_mode_toggle_enabled(self):
         # If search fields were defined on a child ModelAdmin instance,
@@ -63,18 +74,19 @@ class DjangoQLSearchMixin(object):
                 queryset=queryset,
                 search_term=search_term,
             )
-        use_distinct = False
         if not search_term:
-            return queryset, use_distinct
+            return queryset, False
         try:
+            schema_instance = self.djangoql_schema(queryset.model)
+            ast = parse_search(search_term, schema_instance)
             return (
-                apply_search(queryset, search_term, self.djangoql_schema),
-                use_distinct,
+                queryset.filter(build_filter(ast, schema_instance)),
+                needs_distinct(ast, schema_instance),
             )
         except (DjangoQLError, ValueError, FieldError, ValidationError) as e:
             msg = self.djangoql_error_message(e)
             messages.add_message(request, messages.WARNING, msg)
-            return queryset.none(), use_distinct
+            return queryset.none(), False
 
     def djangoql_error_message(self, exception):
         if isinstance(exception, ValidationError):
@@ -111,7 +123,10 @@ class DjangoQLSearchMixin(object):
             custom_urls += [
                 url(
                     r'^introspect/$',
-                    self.admin_site.admin_view(self.introspect),
+                    self.admin_site.admin_view(
+                        self.introspect,
+                        cacheable=True,
+                    ),
                     name='%s_%s_djangoql_introspect' % (
                         self.model._meta.app_label,
                         self.model._meta.model_name,
@@ -124,6 +139,22 @@ class DjangoQLSearchMixin(object):
                     )),
                     name='djangoql_syntax_help',
                 ),
+                url(
+                    r'^suggestions/batch/$',
+                    self.admin_site.admin_view(self.suggestions_batch),
+                    name='%s_%s_suggestions_batch' % (
+                        self.model._meta.app_label,
+                        self.model._meta.model_name,
+                    ),
+                ),
+                url(
+                    r'^suggestions/(?P<model>[\w\.]+)/(?P<field>\w+)/$',
+                    self.admin_site.admin_view(self.suggestions),
+                    name='%s_%s_suggestions' % (
+                        self.model._meta.app_label,
+                        self.model._meta.model_name,
+                    ),
+                ),
                 url(
                     r'^suggestions/(?P<model>[\w\.]+)/(?P<field>\w+)/(?P<page>\d+)$',
                     self.admin_site.admin_view(self.suggestions),
@@ -135,18 +166,74 @@ class DjangoQLSearchMixin(object):
             ]
         return custom_urls + super(DjangoQLSearchMixin, self).get_urls()
 
+    def djangoql_introspection(self, compact=False):
+        """
+        Returns serialized schema and its ETag. Schemas precompiled with
+        djangoql_compile command are served as is. Without inline options the
+        schema doesn't depend on data, so it's serialized once per process.
+        Schemas without introspection cache key are never cached or
+        precompiled, see DjangoQLSchema.get_introspection_cache_key().
+        """
+        schema = self.djangoql_schema(self.model)
+        inline_options = self.djangoql_inline_options
+        key = None
+        if schema.cache_introspection:
+            key = schema.get_introspection_cache_key()
+        cache_key = content = None
+        if key is not None:
+            cache_key = (key, 'compact' if compact else 'json', inline_options)
+            cached = introspection_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            content = load_compiled_schema(schema, compact=compact)
+        cacheable = cache_key is not None and \
+            (content is not None or not inline_options)
+        if content is None:
+            if compact:
+                schema_dict = schema.as_compact_dict(
+                    inline_options=inline_options,
+                )
+            else:
+                schema_dict = schema.as_dict(inline_options=inline_options)
+            content = json.dumps(schema_dict, separators=(',', ':'))\
+                .encode('utf-8')
+        etag = '"%s"' % hashlib.sha1(content).hexdigest()
+        if cacheable:
+            introspection_cache[cache_key] = (content, etag)
+        return content, etag
+
     def introspect(self, request):
-        response = self.djangoql_schema(self.model).as_dict()
-        return HttpResponse(
-            content=json.dumps(response, indent=2),
-            content_type='application/json; charset=utf-8',
+        encoding = request.GET.get('format', 'json')
+        if encoding not in ('json', 'compact'):
+            return HttpResponseBadRequest(
+                content='Unknown format: %s' % encoding,
+                content_type='application/json; charset=utf-8',
+            )
+        content, etag = self.djangoql_introspection(
+            compact=encoding == 'compact',
         )
+        # Weak comparison, GZipMiddleware makes ETags weak
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(
+                content=content,
+                content_type='application/json; charset=utf-8',
+            )
+        response['ETag'] = etag
+        if self.djangoql_introspection_max_age is None:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(
+                response,
+                private=True,
+                max_age=self.djangoql_introspection_max_age,
+            )
+        return response
 
     def suggestions(self, request, *args, **kwargs):
         schema = self.djangoql_schema(self.model)
         model_name = kwargs["model"]
         field_name = kwargs["field"]
-        page = kwargs["page"]
         model = schema.models.get(model_name)
         if model is None:
             return HttpResponseNotFound(
@@ -159,8 +246,90 @@ class DjangoQLSearchMixin(object):
                 content="No such field",
                 content_type='application/json; charset=utf-8',
             )
-        response = field.get_paginated_options(page)
+        search = request.GET.get('search')
+        if kwargs.get('page') is None:
+            # Cursor pagination
+            try:
+                response = field.get_options_page(
+                    cursor=request.GET.get('cursor'),
+                    search=search,
+                )
+            except DjangoQLSchemaError as e:
+                return HttpResponseBadRequest(
+                    content=text_type(e),
+                    content_type='application/json; charset=utf-8',
+                )
+        else:
+            # Page numbers, kept for compatibility. Search is passed only when
+            # it's set, so that overrides without "search" argument still work
+            options_kwargs = {'search': search} if search else {}
+            response = field.get_paginated_options(
+                kwargs['page'],
+                **options_kwargs
+            )
         return HttpResponse(
             content=json.dumps(response, indent=2),
             content_type='application/json; charset=utf-8',
         )
+
+    def suggestions_batch(self, request):
+        """
+        Returns options for many fields in one response. Expects a POST with
+        JSON list of {"model": ..., "field": ..., "cursor": ..., "search": ...}
+        objects, and responds with a list of options pages or {"error": ...}
+        objects in the same order.
+        """
+        if request.method != 'POST':
+            return HttpResponseNotAllowed(['POST'])
+        try:
+            batch = json.loads(request.body.decode('utf-8'))
+        except ValueError:
+            batch = None
+        if not isinstance(batch, list) or \
+                not all(isinstance(item, dict) for item in batch):
+            return HttpResponseBadRequest(
+                content='Expected a JSON list of objects',
+                content_type='application/json; charset=utf-8',
+            )
+        if len(batch) > self.djangoql_suggestions_batch_size:
+            return HttpResponseBadRequest(
+                content='Too many requests in a batch, max is %s' % (
+                    self.djangoql_suggestions_batch_size,
+                ),
+                content_type='application/json; charset=utf-8',
+            )
+        schema = self.djangoql_schema(self.model)
+        results = [None] * len(batch)
+        # Group requests per model, so that each model is looked up once
+        by_model = {}
+        for i, item in enumerate(batch):
+            by_model.setdefault(item.get('model'), []).append(i)
+        for model_name, indexes in by_model.items():
+            model = schema.models.get(model_name) \
+                if isinstance(model_name, text_type) else None
+            for i in indexes:
+                item = batch[i]
+                if model is None:
+                    results[i] = {'error': 'Model not found'}
+                    continue
+                field_name = item.get('field')
+                field = model.get(field_name) \
+                    if isinstance(field_name, text_type) else None
+                if field is None:
+                    results[i] = {'error': 'No such field'}
+                    continue
+                search = item.get('search')
+                if search is not None and not isinstance(search, text_type):
+                    results[i] = {'error': 'Invalid search: %s' % search}
+                    continue
+                try:
+                    results[i] = field.get_options_page(
+                        cursor=item.get('cursor'),
+                        search=search,
+                    )
+                except DjangoQLSchemaError as e:
+                    results[i] = {'error': text_type(e)}
+        return HttpResponse(
+            content=json.dumps(results, indent=2),
+            content_type='application/json; charset=utf-8',
+        )
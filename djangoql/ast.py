@@ -4,9 +4,34 @@ from .compat import text_type
 
 
 class Node(object):
+    """
+    Base class for AST nodes.
+
+    Nodes use __slots__ and are immutable after construction, with the hash
+    computed once from the node fields, so they're compact, cheap to compare
+    and can be used as dict keys or shared between threads.
+    """
+    __slots__ = ('_hash',)
+    _fields = ()
+
+    def _set_fields(self, *values):
+        for name, value in zip(self._fields, values):
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, '_hash', hash((self.__class__,) + values))
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable' % self.__class__.__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError('%s is immutable' % self.__class__.__name__)
+
+    def __reduce__(self):
+        return self.__class__, tuple(getattr(self, f) for f in self._fields)
+
     def __str__(self):
         children = []
-        for k, v in self.__dict__.items():
+        for k in self._fields:
+            v = getattr(self, k)
             if isinstance(v, (list, tuple)):
                 v = '[%s]' % ', '.join([text_type(v) for v in v if v])
             children.append('%s=%s' % (k, v))
@@ -18,11 +43,16 @@ class Node(object):
 
     __repr__ = __str__
 
+    def __hash__(self):
+        return self._hash
+
     def __eq__(self, other):
-        if not isinstance(other, self.__class__):
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__ or self._hash != other._hash:
             return False
-        for k, v in self.__dict__.items():
-            if getattr(other, k) != v:
+        for k in self._fields:
+            if getattr(other, k) != getattr(self, k):
                 return False
         return True
 
@@ -31,20 +61,34 @@ class Node(object):
 
 
 class Expression(Node):
+    __slots__ = _fields = ('left', 'operator', 'right')
+
     def __init__(self, left, operator, right):
-        self.left = left
-        self.operator = operator
-        self.right = right
+        self._set_fields(left, operator, right)
+
+
+class LogicalExpression(Node):
+    """
+    Chain of two or more operands joined with the same logical operator,
+    like "a = 1 or b = 2 or c = 3". Consecutive operators of the same kind are
+    collapsed into a single node, so long generated queries don't produce
+    deeply nested trees.
+    """
+    __slots__ = _fields = ('operator', 'operands')
+
+    def __init__(self, operator, operands):
+        self._set_fields(operator, tuple(operands))
 
 
 class Name(Node):
+    __slots__ = _fields = ('parts',)
+
     def __init__(self, parts):
-        if isinstance(parts, list):
-            self.parts = parts
-        elif isinstance(parts, tuple):
-            self.parts = list(parts)
+        if isinstance(parts, (list, tuple)):
+            parts = tuple(parts)
         else:
-            self.parts = [parts]
+            parts = (parts,)
+        self._set_fields(parts)
 
     @property
     def value(self):
@@ -52,27 +96,41 @@ class Name(Node):
 
 
 class Const(Node):
+    __slots__ = _fields = ('value',)
+
     def __init__(self, value):
-        self.value = value
+        self._set_fields(value)
+        if value is True or value is False:
+            # True == 1 and False == 0 in Python, but not in queries
+            object.__setattr__(self, '_hash', hash((Const, bool, value)))
+
+    def __eq__(self, other):
+        return super(Const, self).__eq__(other) and \
+            isinstance(self.value, bool) == isinstance(other.value, bool)
+
+    __hash__ = Node.__hash__  # overriding __eq__ resets it on Python 3
 
 
 class List(Node):
-    def __init__(self, items):
-        self.items = items
+    __slots__ = ('items', 'value')
+    _fields = ('items',)
 
-    @property
-    def value(self):
-        return [i.value for i in self.items]
+    def __init__(self, items):
+        items = tuple(items)
+        self._set_fields(items)
+        object.__setattr__(self, 'value', tuple(i.value for i in items))
 
 
 class Operator(Node):
+    __slots__ = _fields = ('operator',)
+
     def __init__(self, operator):
-        self.operator = operator
+        self._set_fields(operator)
 
 
 class Logical(Operator):
-    pass
+    __slots__ = ()
 
 
 class Comparison(Operator):
-    pass
+    __slots__ = ()
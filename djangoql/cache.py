@@ -0,0 +1,274 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.db.models.signals import (
+    class_prepared, m2m_changed, post_delete, post_save,
+)
+
+
+class LRUCache(object):
+    """
+    Thread-safe size-bounded mapping, evicts least recently used items first
+    """
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value  # move to the end as the most recent one
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            self._evict()
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def invalidate(self, predicate):
+        """
+        Removes all items with keys matching predicate(key)
+        """
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
+
+    def _evict(self):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+
+# Validated ASTs keyed by (schema class, model, search). The same AST objects
+# are returned to all threads, so they must never be modified.
+ast_cache = LRUCache(maxsize=0)
+
+
+def get_ast_cache():
+    """
+    Returns the process-wide AST cache, or None if it's disabled.
+
+    The cache is enabled with DJANGOQL_AST_CACHE_SIZE setting, which sets the
+    max number of cached search queries.
+    """
+    maxsize = getattr(settings, 'DJANGOQL_AST_CACHE_SIZE', 0)
+    if not maxsize:
+        return None
+    if ast_cache.maxsize != maxsize:
+        ast_cache.resize(maxsize)
+    return ast_cache
+
+
+def invalidate_ast_cache(schema=None, model=None):
+    """
+    Removes cached ASTs for given schema class and / or model. If neither is
+    specified, the whole cache is dropped.
+    """
+    if schema is None and model is None:
+        ast_cache.clear()
+        return
+    ast_cache.invalidate(lambda key: (
+        (schema is None or key[0] is schema) and
+        (model is None or key[1] is model)
+    ))
+
+
+# Results of DjangoQLSchema.introspect() keyed by
+# DjangoQLSchema.get_introspection_cache_key(). Models dicts and field
+# instances in them are shared between all schema instances and threads, so
+# they must never be modified.
+introspection_cache = {}
+
+
+def clear_introspection_cache(**kwargs):
+    """
+    Drops all cached introspection results, and ASTs validated with them.
+    It's called automatically when settings are changed or new models are
+    registered, mostly in tests.
+    """
+    introspection_cache.clear()
+    invalidate_ast_cache()
+
+
+setting_changed.connect(
+    clear_introspection_cache,
+    dispatch_uid='djangoql_clear_introspection_cache',
+)
+class_prepared.connect(
+    clear_introspection_cache,
+    dispatch_uid='djangoql_clear_introspection_cache',
+)
+
+
+# Suggestion options are cached with Django cache framework. Each model has a
+# version number which is a part of cache keys of its fields options, and
+# it's bumped whenever model instances are saved or deleted.
+OPTIONS_KEY_PREFIX = 'djangoql:options'
+_options_locks = [threading.Lock() for _ in range(64)]
+_watched_models = set()
+_watched_models_lock = threading.Lock()
+
+
+def get_options_cache():
+    """
+    Returns Django cache for suggestion options, set with DJANGOQL_CACHE
+    setting, 'default' by default.
+    """
+    return caches[getattr(settings, 'DJANGOQL_CACHE', 'default')]
+
+
+def model_key(model):
+    return '%s.%s' % (model._meta.app_label, model._meta.model_name)
+
+
+def get_options_version(model):
+    cache = get_options_cache()
+    key = '%s:version:%s' % (OPTIONS_KEY_PREFIX, model_key(model))
+    version = cache.get(key)
+    if version is None:
+        # Start with a timestamp, not 1, so that an evicted version can't
+        # bring back options cached with it before
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_options(model):
+    """
+    Drops cached suggestion options of all fields of given model
+    """
+    cache = get_options_cache()
+    key = '%s:version:%s' % (OPTIONS_KEY_PREFIX, model_key(model))
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def watch_model(model):
+    """
+    Invalidates cached options of given model when its instances are saved
+    or deleted, or its many-to-many relations are changed. It's called for
+    models of fields with suggest_options_cache_timeout when schemas are
+    introspected.
+    """
+    if model in _watched_models:
+        return
+    with _watched_models_lock:
+        if model in _watched_models:
+            return
+
+        def receiver(**kwargs):
+            action = kwargs.get('action')
+            if action is None or action.startswith('post_'):
+                invalidate_options(model)
+
+        uid = 'djangoql_options_%s' % model_key(model)
+        post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(
+            receiver,
+            sender=model,
+            weak=False,
+            dispatch_uid=uid,
+        )
+        for field in model._meta.get_fields():
+            if not field.many_to_many:
+                continue
+            rel = getattr(field, 'remote_field', None) or \
+                getattr(field, 'rel', None)
+            through = getattr(field, 'through', None) or \
+                getattr(rel, 'through', None)
+            if through is not None:
+                m2m_changed.connect(
+                    receiver,
+                    sender=through,
+                    weak=False,
+                    dispatch_uid=uid,
+                )
+        _watched_models.add(model)
+
+
+def cached_options(method):
+    """
+    Caches results of DjangoQLField methods which return suggestion options
+    for suggest_options_cache_timeout seconds. Concurrent cache misses for
+    the same options in one process run the query only once.
+    """
+    @wraps(method)
+    def wrapper(field, *args, **kwargs):
+        timeout = field.suggest_options_cache_timeout
+        if timeout is None or field.model is None:
+            return method(field, *args, **kwargs)
+        watch_model(field.model)
+        call = json.dumps(
+            [
+                field.__class__.__module__,
+                field.__class__.__name__,
+                method.__name__,
+                args,
+                sorted(kwargs.items()),
+            ],
+            cls=DjangoJSONEncoder,
+        )
+        key = '%s:%s:%s:%s:%s' % (
+            OPTIONS_KEY_PREFIX,
+            model_key(field.model),
+            get_options_version(field.model),
+            field.name,
+            hashlib.sha1(call.encode('utf-8')).hexdigest(),
+        )
+        cache = get_options_cache()
+        result = cache.get(key)
+        if result is None:
+            with _options_locks[hash(key) % len(_options_locks)]:
+                result = cache.get(key)
+                if result is None:
+                    result = method(field, *args, **kwargs)
+                    cache.set(key, result, timeout)
+        return result
+    return wrapper
@@ -8,3 +8,8 @@ if PY2:
 else:
     binary_type = bytes
     text_type = str
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # Python 2
+    from collections import Mapping  # noqa
@@ -0,0 +1,6 @@
+"""
+Materialized suggestion options, an optional app. Add
+'djangoql.contrib.suggestions' to INSTALLED_APPS to enable it, see
+djangoql.contrib.suggestions.materialized.
+"""
+default_app_config = 'djangoql.contrib.suggestions.apps.SuggestionsConfig'
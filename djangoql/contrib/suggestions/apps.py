@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+from django.core.signals import setting_changed
+
+
+class SuggestionsConfig(AppConfig):
+    name = 'djangoql.contrib.suggestions'
+    label = 'djangoql_suggestions'
+    verbose_name = 'DjangoQL suggestions'
+
+    def ready(self):
+        from .materialized import connect_signals
+        connect_signals()
+        setting_changed.connect(
+            connect_signals,
+            dispatch_uid='djangoql_suggestions_connect_signals',
+        )
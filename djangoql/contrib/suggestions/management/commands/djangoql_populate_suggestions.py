@@ -0,0 +1,30 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...materialized import populate
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds materialized suggestion options of models listed in ' \
+           'DJANGOQL_MATERIALIZED_SUGGESTIONS setting.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models',
+            nargs='*',
+            metavar='app_label.ModelName',
+            help='Models to rebuild, all configured models by default.',
+        )
+
+    def handle(self, *args, **options):
+        config = getattr(settings, 'DJANGOQL_MATERIALIZED_SUGGESTIONS', None)
+        labels = options['models'] or list(config or ())
+        for label in labels:
+            try:
+                model = apps.get_model(label)
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+            created = populate(model)
+            if options['verbosity'] >= 1:
+                self.stdout.write('%s: %s options' % (label, created))
@@ -0,0 +1,276 @@
+"""
+Materialized suggestion options.
+
+Distinct values of fields listed in DJANGOQL_MATERIALIZED_SUGGESTIONS setting
+are kept in SuggestionOption table together with their frequencies, so that
+suggestions for large tables don't have to scan them with DISTINCT or GROUP
+BY. The table is updated on every save and delete of instances of these
+models, and can be rebuilt with djangoql_populate_suggestions management
+command, e.g. after bulk updates which don't send model signals:
+
+    DJANGOQL_MATERIALIZED_SUGGESTIONS = {
+        'auth.user': ['first_name', 'last_name'],
+    }
+
+Options are stored as strings, so only text fields are materialized, other
+fields listed in the setting are ignored. Without djangoql.contrib.suggestions
+in INSTALLED_APPS no fields are materialized.
+"""
+from __future__ import unicode_literals
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, Count, F, TextField
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from ...cache import model_key
+from ...compat import text_type
+
+
+MAX_VALUE_LENGTH = 255
+TEXT_FIELDS = (CharField, TextField)
+
+
+def get_materialized_fields(model):
+    """
+    Returns names of materialized text fields of given model from
+    DJANGOQL_MATERIALIZED_SUGGESTIONS setting
+    """
+    config = getattr(settings, 'DJANGOQL_MATERIALIZED_SUGGESTIONS', None)
+    if not config or model is None or \
+            not apps.is_installed('djangoql.contrib.suggestions'):
+        return ()
+    model = model._meta.concrete_model
+    key = model_key(model)
+    for label, fields in config.items():
+        if label.lower() == key:
+            return tuple(
+                name for name in fields
+                if isinstance(model._meta.get_field(name), TEXT_FIELDS)
+            )
+    return ()
+
+
+def is_materialized(model, field_name):
+    return field_name in get_materialized_fields(model)
+
+
+def get_materialized_options(model, field_name, ranking='value'):
+    """
+    Returns a flat queryset of materialized values of given model field,
+    ordered either by value or by frequency if ranking is 'frequency'
+    """
+    from .models import SuggestionOption
+    if ranking == 'frequency':
+        ordering = ('-frequency', 'value')
+    else:
+        ordering = ('value',)
+    return SuggestionOption.objects\
+        .filter(
+            model=model_key(model._meta.concrete_model),
+            field=field_name,
+        )\
+        .order_by(*ordering)\
+        .values_list('value', flat=True)
+
+
+def to_option(value):
+    """
+    Converts field value to a stored option, returns None if it can't be
+    stored
+    """
+    if value is None:
+        return None
+    value = text_type(value)
+    if len(value) > MAX_VALUE_LENGTH:
+        return None
+    return value
+
+
+def update_frequency(label, field_name, value, delta):
+    """
+    Adds delta to frequency of the option, creating or deleting its row
+    as needed
+    """
+    from .models import SuggestionOption
+    options = SuggestionOption.objects.filter(
+        model=label,
+        field=field_name,
+        value=value,
+    )
+    updated = options.update(frequency=F('frequency') + delta)
+    if delta < 0:
+        options.filter(frequency__lte=0).delete()
+        return
+    if not updated:
+        try:
+            with transaction.atomic():
+                SuggestionOption.objects.create(
+                    model=label,
+                    field=field_name,
+                    value=value,
+                    frequency=delta,
+                )
+        except IntegrityError:
+            # Created concurrently
+            options.update(frequency=F('frequency') + delta)
+
+
+def get_saved_fields(model, fields, update_fields):
+    """
+    Returns materialized fields which are written by save() with given
+    update_fields, others keep their values in the database
+    """
+    if update_fields is None:
+        return fields
+    return tuple(
+        name for name in fields
+        if name in update_fields or
+        model._meta.get_field(name).attname in update_fields
+    )
+
+
+def get_field_values(model, instance, fields):
+    result = {}
+    for name in fields:
+        attname = model._meta.get_field(name).attname
+        result[name] = to_option(getattr(instance, attname, None))
+    return result
+
+
+def on_pre_save(sender, instance, update_fields=None, **kwargs):
+    model = sender._meta.concrete_model
+    fields = get_saved_fields(
+        model,
+        get_materialized_fields(sender),
+        update_fields,
+    )
+    if not fields or instance._state.adding or instance.pk is None:
+        return
+    attnames = [model._meta.get_field(name).attname for name in fields]
+    old = model._base_manager\
+        .filter(pk=instance.pk)\
+        .values_list(*attnames)\
+        .first()
+    if old is not None:
+        instance._djangoql_suggestions = dict(
+            zip(fields, [to_option(v) for v in old]),
+        )
+
+
+def on_post_save(sender, instance, created, update_fields=None, **kwargs):
+    model = sender._meta.concrete_model
+    fields = get_saved_fields(
+        model,
+        get_materialized_fields(sender),
+        update_fields,
+    )
+    if not fields:
+        return
+    label = model_key(model)
+    old = instance.__dict__.pop('_djangoql_suggestions', None) or {}
+    new = get_field_values(model, instance, fields)
+    for name in fields:
+        if old.get(name) == new[name]:
+            continue
+        if old.get(name) is not None:
+            update_frequency(label, name, old[name], -1)
+        if new[name] is not None:
+            update_frequency(label, name, new[name], 1)
+
+
+def on_post_delete(sender, instance, **kwargs):
+    fields = get_materialized_fields(sender)
+    if not fields:
+        return
+    model = sender._meta.concrete_model
+    label = model_key(model)
+    for name, value in get_field_values(model, instance, fields).items():
+        if value is not None:
+            update_frequency(label, name, value, -1)
+
+
+_connected_models = []
+
+
+def get_watched_models():
+    """
+    Returns models with materialized fields, including their proxies and
+    other models sharing the concrete model
+    """
+    concrete_models = set()
+    config = getattr(settings, 'DJANGOQL_MATERIALIZED_SUGGESTIONS', None)
+    for label in config or ():
+        model = apps.get_model(label)
+        if get_materialized_fields(model):
+            concrete_models.add(model._meta.concrete_model)
+    return [
+        model for model in apps.get_models()
+        if model._meta.concrete_model in concrete_models
+    ]
+
+
+def connect_signals(**kwargs):
+    """
+    Connects signal receivers to models listed in
+    DJANGOQL_MATERIALIZED_SUGGESTIONS setting only, and reconnects them when
+    the setting is changed
+    """
+    setting = kwargs.get('setting')
+    if setting is not None and setting not in (
+            'DJANGOQL_MATERIALIZED_SUGGESTIONS', 'INSTALLED_APPS'):
+        return
+    while _connected_models:
+        model = _connected_models.pop()
+        uid = 'djangoql_suggestions_%s' % model_key(model)
+        pre_save.disconnect(sender=model, dispatch_uid=uid)
+        post_save.disconnect(sender=model, dispatch_uid=uid)
+        post_delete.disconnect(sender=model, dispatch_uid=uid)
+    for model in get_watched_models():
+        uid = 'djangoql_suggestions_%s' % model_key(model)
+        pre_save.connect(on_pre_save, sender=model, dispatch_uid=uid)
+        post_save.connect(on_post_save, sender=model, dispatch_uid=uid)
+        post_delete.connect(on_post_delete, sender=model, dispatch_uid=uid)
+        _connected_models.append(model)
+
+
+def populate(model, fields=None):
+    """
+    Rebuilds materialized options of given model from scratch. Returns the
+    number of stored options.
+    """
+    from .models import SuggestionOption
+    model = model._meta.concrete_model
+    label = model_key(model)
+    if fields is None:
+        fields = get_materialized_fields(model)
+    created = 0
+    for name in fields:
+        attname = model._meta.get_field(name).attname
+        frequencies = {}
+        rows = model._base_manager\
+            .order_by()\
+            .values(attname)\
+            .annotate(djangoql_frequency=Count('pk'))\
+            .values_list(attname, 'djangoql_frequency')
+        for value, frequency in rows:
+            value = to_option(value)
+            if value is not None:
+                frequencies[value] = frequencies.get(value, 0) + frequency
+        with transaction.atomic():
+            SuggestionOption.objects.filter(model=label, field=name).delete()
+            SuggestionOption.objects.bulk_create(
+                [
+                    SuggestionOption(
+                        model=label,
+                        field=name,
+                        value=value,
+                        frequency=frequency,
+                    )
+                    for value, frequency in frequencies.items()
+                ],
+                batch_size=500,
+            )
+        created += len(frequencies)
+    return created
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.28 on 2026-10-17 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuggestionOption',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('field', models.CharField(max_length=100)),
+                ('value', models.CharField(max_length=255)),
+                ('frequency', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('model', 'field', 'value')},
+                'index_together': {('model', 'field', 'frequency')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+from __future__ import unicode_literals
+
+from django.db import models
+
+
+class SuggestionOption(models.Model):
+    """
+    Distinct value of a model field with the number of model instances having
+    it. Rows are maintained incrementally for fields listed in
+    DJANGOQL_MATERIALIZED_SUGGESTIONS setting, see
+    djangoql.contrib.suggestions.materialized.
+    """
+    model = models.CharField(max_length=100)
+    field = models.CharField(max_length=100)
+    value = models.CharField(max_length=255)
+    frequency = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('model', 'field', 'value'),)
+        index_together = (('model', 'field', 'frequency'),)
+
+    def __str__(self):
+        return '%s.%s: %s' % (self.model, self.field, self.value)
@@ -1,29 +1,89 @@
 from __future__ import unicode_literals
 
-import ply.lex as lex
-from ply.lex import TOKEN
+import re
 
 from .exceptions import DjangoQLLexerError
 
 
+class Token(object):
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'lexer')
+
+    def __init__(self, type, value, lineno, lexpos, lexer):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+        self.lexer = lexer
+
+    def __str__(self):
+        return 'Token(%s,%r,%d,%d)' % (
+            self.type,
+            self.value,
+            self.lineno,
+            self.lexpos,
+        )
+
+    __repr__ = __str__
+
+
 class DjangoQLLexer(object):
+    """
+    Splits DjangoQL query into tokens.
+
+    All token rules are combined into a single compiled regex with named
+    groups, so each token together with preceding whitespace costs one regex
+    match. Keywords are matched as names first and then looked up in a table.
+    """
     def __init__(self, **kwargs):
-        self._lexer = lex.lex(module=self, **kwargs)
+        # Options of ply.lex, like debug=True, are accepted for backwards
+        # compatibility and ignored
         self.reset()
 
     def reset(self):
         self.text = ''
-        self._lexer.lineno = 1
+        self.lineno = 1
+        # Position where the current line starts, used for column numbers
+        self.line_start = 0
+        self._tokens = iter(())
         return self
 
     def input(self, s):
         self.reset()
         self.text = s
-        self._lexer.input(s)
+        self._tokens = self.tokenize(s)
         return self
 
     def token(self):
-        return self._lexer.token()
+        return next(self._tokens, None)
+
+    def tokenize(self, text):
+        keywords = self.keywords
+        for m in self.re_master.finditer(text):
+            kind = m.lastgroup
+            if kind == 'newline':
+                self.lineno += m.end() - m.start(kind)
+                self.line_start = m.end()
+                continue
+            pos = m.start(kind)
+            if kind == 'error':
+                self.error(pos)
+            value = m.group(kind)
+            if kind == 'NAME':
+                keyword = keywords.get(value)
+                if keyword is not None:
+                    kind = keyword
+                elif '.' in value:
+                    # Keyword followed by a dot, like "or.a", isn't a name.
+                    # Dot can't start any token, so that's an error.
+                    head = value[:value.index('.')]
+                    keyword = keywords.get(head)
+                    if keyword is not None and \
+                            keyword not in self.name_keywords:
+                        yield Token(keyword, head, self.lineno, pos, self)
+                        self.error(pos + len(head))
+            elif kind == 'STRING_VALUE':
+                value = value[1:-1]  # cut leading and trailing quotes ""
+            yield Token(kind, value, self.lineno, pos, self)
 
     # Iterator interface
     def __iter__(self):
@@ -41,11 +101,23 @@ class DjangoQLLexer(object):
         """
         Returns token position in current text, starting from 1
         """
+        if t.lexpos >= self.line_start:
+            # Token is on the current line, which is the usual case
+            return t.lexpos - self.line_start + 1
         cr = max(self.text.rfind(l, 0, t.lexpos) for l in self.line_terminators)
         if cr == -1:
             return t.lexpos + 1
         return t.lexpos - cr
 
+    def error(self, pos):
+        t = Token(None, self.text[pos:], self.lineno, pos, self)
+        raise DjangoQLLexerError(
+            message='Illegal character %s' % repr(t.value[0]),
+            value=t.value,
+            line=t.lineno,
+            column=self.find_column(t),
+        )
+
     whitespace = ' \t\v\f\u00A0'
     line_terminators = '\n\r\u2028\u2029'
 
@@ -82,80 +154,53 @@ class DjangoQLLexer(object):
         'LESS_EQUAL',
         'CONTAINS',
         'NOT_CONTAINS',
+        'STARTSWITH',
     ]
 
-    t_COMMA = ','
-    t_PAREN_L = r'\('
-    t_PAREN_R = r'\)'
-    t_EQUALS = '='
-    t_NOT_EQUALS = '!='
-    t_GREATER = '>'
-    t_GREATER_EQUAL = '>='
-    t_LESS = '<'
-    t_LESS_EQUAL = '<='
-    t_CONTAINS = '~'
-    t_NOT_CONTAINS = '!~'
-
-    t_NAME = r'[_A-Za-z][_0-9A-Za-z]*(\.[_A-Za-z][_0-9A-Za-z]*)*'
-
-    t_ignore = whitespace
-
-    @TOKEN(r'\"(' + re_escaped_char +
-           '|' + re_escaped_unicode +
-           '|' + re_string_char + r')*\"')
-    def t_STRING_VALUE(self, t):
-        t.value = t.value[1:-1]  # cut leading and trailing quotes ""
-        return t
-
-    @TOKEN(re_int_value + re_fraction_part + re_exponent_part + '|' +
-           re_int_value + re_fraction_part + '|' +
-           re_int_value + re_exponent_part)
-    def t_FLOAT_VALUE(self, t):
-        return t
-
-    @TOKEN(re_int_value)
-    def t_INT_VALUE(self, t):
-        return t
-
-    not_followed_by_name = '(?![_0-9A-Za-z])'
-
-    @TOKEN('or' + not_followed_by_name)
-    def t_OR(self, t):
-        return t
-
-    @TOKEN('and' + not_followed_by_name)
-    def t_AND(self, t):
-        return t
-
-    @TOKEN('not' + not_followed_by_name)
-    def t_NOT(self, t):
-        return t
-
-    @TOKEN('in' + not_followed_by_name)
-    def t_IN(self, t):
-        return t
-
-    @TOKEN('True' + not_followed_by_name)
-    def t_TRUE(self, t):
-        return t
-
-    @TOKEN('False' + not_followed_by_name)
-    def t_FALSE(self, t):
-        return t
-
-    @TOKEN('None' + not_followed_by_name)
-    def t_NONE(self, t):
-        return t
-
-    def t_error(self, t):
-        raise DjangoQLLexerError(
-            message='Illegal character %s' % repr(t.value[0]),
-            value=t.value,
-            line=t.lineno,
-            column=self.find_column(t),
-        )
-
-    @TOKEN('[' + re_line_terminators + ']+')
-    def t_newline(self, t):
-        t.lexer.lineno += len(t.value)
-        return
+    keywords = {
+        'or': 'OR',
+        'and': 'AND',
+        'not': 'NOT',
+        'in': 'IN',
+        'startswith': 'STARTSWITH',
+        'True': 'TRUE',
+        'False': 'FALSE',
+        'None': 'NONE',
+    }
+
+    # Keywords which are also valid names, the parser tells them apart by
+    # their position. "startswith" was added later than the others, and
+    # fields with such name must keep working.
+    name_keywords = ('STARTSWITH',)
+
+    # Order matters: the first matching alternative wins, so longer
+    # punctuators go before their prefixes and floats go before integers.
+    # Any other character is matched as an error.
+    re_rules = (
+        ('newline', '[' + re_line_terminators + ']+'),
+        ('STRING_VALUE', r'\"(?:' + re_escaped_char +
+                         '|' + re_escaped_unicode +
+                         '|' + re_string_char + r')*\"'),
+        ('FLOAT_VALUE', re_int_value + re_fraction_part + re_exponent_part +
+                        '|' + re_int_value + re_fraction_part +
+                        '|' + re_int_value + re_exponent_part),
+        ('INT_VALUE', re_int_value),
+        ('NAME', r'[_A-Za-z][_0-9A-Za-z]*(?:\.[_A-Za-z][_0-9A-Za-z]*)*'),
+        ('NOT_EQUALS', '!='),
+        ('GREATER_EQUAL', '>='),
+        ('LESS_EQUAL', '<='),
+        ('NOT_CONTAINS', '!~'),
+        ('PAREN_L', r'\('),
+        ('PAREN_R', r'\)'),
+        ('COMMA', ','),
+        ('EQUALS', '='),
+        ('GREATER', '>'),
+        ('LESS', '<'),
+        ('CONTAINS', '~'),
+        ('error', '[^' + whitespace + ']'),
+    )
+    re_master = re.compile(
+        '[' + whitespace + ']*(?:' +
+        '|'.join('(?P<%s>%s)' % rule for rule in re_rules) +
+        ')'
+    )
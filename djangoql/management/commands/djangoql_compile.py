@@ -0,0 +1,110 @@
+import os
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from ...parser import (
+    get_parse_tables_path, parse_tables_are_current, write_parse_tables,
+)
+from ...precompile import compile_schema, get_compiled_dir
+from ...queryset import DjangoQLQuerySet
+from ...schema import DjangoQLSchema
+
+
+class Command(BaseCommand):
+    help = 'Checks parser tables and precompiles schemas of DjangoQL admins ' \
+           'and models with DjangoQLQuerySet, to be served by the ' \
+           'introspection view.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Directory for precompiled schemas, DJANGOQL_COMPILED_DIR '
+                 'setting by default.',
+        )
+        parser.add_argument(
+            '--parse-tables',
+            help='File for pickled parser tables, DJANGOQL_PARSE_TABLES '
+                 'setting by default.',
+        )
+        parser.add_argument(
+            '--with-options',
+            action='store_true',
+            help='Include a snapshot of suggestion options in schemas.',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Fail if parser tables are out of date instead of '
+                 'regenerating them.',
+        )
+
+    def handle(self, *args, **options):
+        tables = options['parse_tables'] or get_parse_tables_path()
+        if not parse_tables_are_current(tables):
+            if options['check']:
+                raise CommandError(
+                    '%s is out of date' % (tables or 'djangoql/parsetab.py'),
+                )
+            if tables:
+                write_parse_tables(tables)
+                self.log(options, 'Parser tables regenerated')
+            else:
+                # The package directory is not ours to write to
+                self.stderr.write(
+                    'djangoql/parsetab.py is out of date, specify '
+                    '--parse-tables or DJANGOQL_PARSE_TABLES setting to '
+                    'regenerate parser tables',
+                )
+
+        directory = options['output'] or get_compiled_dir()
+        if not directory:
+            raise CommandError(
+                'Specify --output or DJANGOQL_COMPILED_DIR setting',
+            )
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        for schema in self.get_schemas():
+            for compact in (False, True):
+                path = compile_schema(
+                    schema,
+                    directory,
+                    compact=compact,
+                    inline_options=options['with_options'],
+                )
+                self.log(options, path)
+
+    def log(self, options, message):
+        if options['verbosity'] >= 1:
+            self.stdout.write(message)
+
+    def get_schemas(self):
+        seen = set()
+        for schema_class, model in self.get_search_models():
+            schema = schema_class(model)
+            if not schema.cache_introspection:
+                continue
+            key = schema.get_introspection_cache_key()
+            # Schemas without a cache key may differ between requests
+            if key is not None and key not in seen:
+                seen.add(key)
+                yield schema
+
+    def get_search_models(self):
+        """
+        Yields (schema class, model) of DjangoQL admins and models with
+        DjangoQLQuerySet
+        """
+        if apps.is_installed('django.contrib.admin'):
+            from django.contrib.admin.sites import all_sites
+
+            from ...admin import DjangoQLSearchMixin
+            for site in all_sites:
+                for model, model_admin in site._registry.items():
+                    if isinstance(model_admin, DjangoQLSearchMixin) and \
+                            model_admin.djangoql_completion:
+                        yield model_admin.djangoql_schema, model
+        for model in apps.get_models():
+            queryset = model._default_manager.all()
+            if isinstance(queryset, DjangoQLQuerySet):
+                yield queryset.djangoql_schema or DjangoQLSchema, model
@@ -0,0 +1,400 @@
+"""
+Rewrites validated DjangoQL AST into an equivalent one which is cheaper to
+query, enabled with DjangoQLSchema.optimize_queries.
+
+- duplicate comparisons in the same "and" / "or" are dropped;
+- "a = 1 or a = 2" becomes "a in (1, 2)", and "a != 1 and a != 2" becomes
+  "a not in (1, 2)";
+- bounds of numeric fields are merged, "a > 5 and a > 10" becomes "a > 10"
+  and "a > 5 or a > 10" becomes "a > 5";
+- comparisons which can never match, like "a > 10 and a < 5", are folded to
+  Const(False), and ones which always match, like "a = None or a != None",
+  to Const(True). Constants are folded away from logical expressions, so
+  they can only be left at the root of the tree.
+
+Only fields with the default lookups and without choices are rewritten,
+comparisons with None are never merged into lists, and values are compared
+in Python only for numeric and boolean fields, since string comparison in
+the database depends on collation. Comparisons are never folded to
+constants in queries which join multi-valued relations, because Django
+correlates negated lookups of a relation with its join, so dropping a
+comparison may change the meaning of others. For the same reason,
+comparisons with fields of such relations are left as is in these queries.
+"""
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+from decimal import Decimal
+
+from .ast import Comparison, Const, List, Logical, LogicalExpression
+from .ast import Expression
+from .compat import PY2
+from .schema import DjangoQLField, overrides
+
+
+TRUE = Const(True)
+FALSE = Const(False)
+
+NUMBER_TYPES = (int, long, float, Decimal) if PY2 else (int, float, Decimal)  # noqa
+LOWER_BOUNDS = ('>', '>=')
+UPPER_BOUNDS = ('<', '<=')
+NEGATIVE_OPERATORS = ('!=', '!~', 'not in', 'not startswith')
+LOOKUP_METHODS = (
+    'get_lookup', 'get_operator', 'get_lookup_name', 'get_lookup_value',
+)
+
+
+def optimize(node, schema_instance):
+    """
+    Returns optimized AST, see module docstring
+    """
+    return Optimizer(schema_instance).optimize(node)
+
+
+def is_constant(node):
+    return isinstance(node, Const)
+
+
+class Optimizer(object):
+    def __init__(self, schema_instance):
+        self.schema = schema_instance
+        self._fields = {}
+        self.fold_constants = True
+
+    def optimize(self, node):
+        self.fold_constants = not self.has_joins(node)
+        # Post-order walk with an explicit stack, like build_filter()
+        results = []
+        stack = [(node, False)]
+        while stack:
+            node, visited = stack.pop()
+            if not isinstance(node.operator, Logical):
+                results.append(node)
+            elif not visited:
+                stack.append((node, True))
+                stack.extend((o, False) for o in reversed(node.operands))
+            else:
+                count = len(node.operands)
+                operands = results[-count:]
+                del results[-count:]
+                results.append(self.optimize_logical(node, operands))
+        return results[0]
+
+    def field(self, name):
+        """
+        Returns schema field if comparisons with it can be rewritten
+        """
+        if name not in self._fields:
+            field = self.schema.resolve_name(name)
+            # Values of fields with choices are looked up by their labels,
+            # which is done differently for single values and lists
+            if field is not None and not field.get_choices_index() and \
+                    not any(
+                    overrides(field, DjangoQLField, method)
+                    for method in LOOKUP_METHODS):
+                self._fields[name] = field
+            else:
+                self._fields[name] = None
+        return self._fields[name]
+
+    def has_joins(self, node):
+        """
+        Checks if the query may join multi-valued relations: it has positive
+        comparisons with their fields, or fields with custom lookups
+        """
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node.operator, Logical):
+                stack.extend(node.operands)
+                continue
+            field = self.schema.resolve_name(node.left)
+            if field is not None and any(
+                    getattr(field.__class__, method).__module__ !=
+                    DjangoQLField.__module__
+                    for method in LOOKUP_METHODS):
+                return True
+            if node.operator.operator not in NEGATIVE_OPERATORS and \
+                    self.is_multivalued(node.left):
+                return True
+        return False
+
+    def is_multivalued(self, name):
+        """
+        Checks if name refers to a field of a many-to-many or reverse
+        foreign key relation, or such relation itself
+        """
+        return self.schema.get_multivalued_relation(name)[0] is not None
+
+    def comparable(self, field, values):
+        """
+        Returns True if values of the field can be compared in Python
+        """
+        if field.type == 'bool':
+            types = (bool,)
+        elif field.type in ('int', 'float'):
+            types = NUMBER_TYPES
+        else:
+            return False
+        if field.get_choices_index():
+            return False
+        return all(
+            v is None or (isinstance(v, types) and
+                          (field.type == 'bool') == isinstance(v, bool))
+            for v in values
+        )
+
+    def optimize_logical(self, node, operands):
+        operator = node.operator.operator
+        absorbing, neutral = (TRUE, FALSE) if operator == 'or' \
+            else (FALSE, TRUE)
+        flat = []
+        seen = set()
+        for operand in operands:
+            if isinstance(operand, LogicalExpression) and \
+                    operand.operator.operator == operator:
+                children = operand.operands
+            else:
+                children = [operand]
+            for child in children:
+                if child == absorbing:
+                    return absorbing
+                if child == neutral or child in seen:
+                    continue
+                seen.add(child)
+                flat.append(child)
+
+        if operator == 'or':
+            flat = self.optimize_or(flat)
+        else:
+            flat = self.optimize_and(flat)
+        if is_constant(flat):
+            return flat
+        if not flat:
+            return neutral
+        if len(flat) == 1:
+            return flat[0]
+        if flat == list(node.operands):
+            return node
+        return LogicalExpression(operator=node.operator, operands=flat)
+
+    def group(self, operands):
+        """
+        Groups comparisons of fields which can be rewritten by field name,
+        returns OrderedDict of names to lists of (index, expression)
+        """
+        groups = OrderedDict()
+        for i, operand in enumerate(operands):
+            if not isinstance(operand.operator, Comparison) or \
+                    self.field(operand.left) is None:
+                continue
+            if not self.fold_constants and \
+                    self.is_multivalued(operand.left):
+                # Lookups of joined multi-valued relations are correlated
+                continue
+            groups.setdefault(operand.left, []).append((i, operand))
+        return groups
+
+    def optimize_or(self, operands):
+        groups = self.group(operands)
+        replaced = {}
+        for name, items in groups.items():
+            field = self.field(name)
+            positive = [
+                (i, e) for i, e in items
+                if e.operator.operator in ('=', 'in') and
+                None not in values_of(e)
+            ]
+            all_values = [v for _, e in items for v in values_of(e)]
+            comparable = self.comparable(field, all_values)
+            if self.fold_constants and comparable and len(name.parts) == 1:
+                # "a = 1 or a != 1" matches all objects, including None.
+                # Only for fields of the current model, see merge_bounds()
+                matched = set()
+                for _, e in items:
+                    if e.operator.operator in ('=', 'in'):
+                        matched.update(values_of(e))
+                for _, e in items:
+                    if e.operator.operator in ('!=', 'not in') and \
+                            set(values_of(e)) <= matched:
+                        return TRUE
+            if comparable:
+                # Keep the weakest of lower and upper bounds
+                for bounds, weaker in ((LOWER_BOUNDS, min),
+                                       (UPPER_BOUNDS, max)):
+                    found = [
+                        (i, e) for i, e in items
+                        if e.operator.operator in bounds and
+                        e.right.value is not None
+                    ]
+                    if len(found) > 1:
+                        keep = weakest(found, weaker)
+                        for i, e in found:
+                            replaced[i] = e if i == keep else None
+            if len(positive) > 1:
+                replaced.update(self.merge_list(positive, 'in'))
+        return apply(operands, replaced)
+
+    def optimize_and(self, operands):
+        groups = self.group(operands)
+        replaced = {}
+        for name, items in groups.items():
+            field = self.field(name)
+            negative = [
+                (i, e) for i, e in items
+                if e.operator.operator in ('!=', 'not in') and
+                None not in values_of(e)
+            ]
+            all_values = [v for _, e in items for v in values_of(e)]
+            if self.comparable(field, all_values):
+                result = self.merge_bounds(name, items)
+                if not is_constant(result):
+                    replaced.update(result)
+                elif self.fold_constants:
+                    return result
+            if len(negative) > 1:
+                replaced.update(self.merge_list(negative, 'not in'))
+        return apply(operands, replaced)
+
+    def merge_list(self, items, operator):
+        """
+        Merges comparisons into one "in" or "not in" in place of the first
+        of them
+        """
+        items_by_value = OrderedDict()
+        for _, e in items:
+            for item in list_items(e):
+                items_by_value.setdefault((type(item.value), item.value), item)
+        values = list(items_by_value.values())
+        first, expression = items[0]
+        if len(values) == 1:
+            merged = Expression(
+                left=expression.left,
+                operator=Comparison('=' if operator == 'in' else '!='),
+                right=values[0],
+            )
+        else:
+            merged = Expression(
+                left=expression.left,
+                operator=Comparison(operator),
+                right=List(values),
+            )
+        replaced = dict((i, None) for i, _ in items)
+        replaced[first] = merged
+        return replaced
+
+    def merge_bounds(self, name, items):
+        """
+        Merges bounds and equalities of one numeric field joined with "and".
+        Returns FALSE if they can't match anything, otherwise a dict of
+        replaced operands.
+        """
+        lower = upper = None
+        equal = set()
+        unequal = set()
+        for i, e in items:
+            op = e.operator.operator
+            value = e.right.value
+            if op in LOWER_BOUNDS and value is not None:
+                strict = op == '>'
+                if lower is None or value > lower[0] or \
+                        (value == lower[0] and strict):
+                    lower = (value, strict, i)
+            elif op in UPPER_BOUNDS and value is not None:
+                strict = op == '<'
+                if upper is None or value < upper[0] or \
+                        (value == upper[0] and strict):
+                    upper = (value, strict, i)
+            elif op == '=':
+                equal.add(value)
+            elif op in ('!=', 'not in') and len(name.parts) == 1:
+                # Negated lookups of multi-valued relations run in
+                # subqueries, so they're only combined with positive ones
+                # for fields of the current model
+                unequal.update(values_of(e))
+
+        if len(equal) > 1 or equal & unequal:
+            return FALSE
+        if None in equal and (lower or upper):
+            return FALSE
+        if lower and upper:
+            if lower[0] > upper[0] or \
+                    (lower[0] == upper[0] and (lower[1] or upper[1])):
+                return FALSE
+        if equal:
+            value = next(iter(equal))
+            if value is not None and (
+                    (lower and not in_lower(value, lower)) or
+                    (upper and not in_upper(value, upper))):
+                return FALSE
+
+        replaced = {}
+        for i, e in items:
+            op = e.operator.operator
+            if e.right.value is None:
+                continue
+            if op in LOWER_BOUNDS and (equal or i != lower[2]):
+                replaced[i] = None
+            elif op in UPPER_BOUNDS and (equal or i != upper[2]):
+                replaced[i] = None
+        if not equal and lower and upper and lower[0] == upper[0]:
+            # "a >= 5 and a <= 5" is "a = 5"
+            replaced[lower[2]] = Expression(
+                left=name,
+                operator=Comparison('='),
+                right=items_by_index(items)[lower[2]].right,
+            )
+            replaced[upper[2]] = None
+        return replaced
+
+
+def values_of(expression):
+    if isinstance(expression.right, List):
+        return expression.right.value
+    return (expression.right.value,)
+
+
+def list_items(expression):
+    if isinstance(expression.right, List):
+        return expression.right.items
+    return (expression.right,)
+
+
+def items_by_index(items):
+    return dict(items)
+
+
+def weakest(found, weaker):
+    """
+    Returns index of the weakest bound among (index, expression) pairs
+    """
+    value = weaker(e.right.value for _, e in found)
+    candidates = [(i, e) for i, e in found if e.right.value == value]
+    for i, e in candidates:
+        if e.operator.operator in ('>=', '<='):
+            return i
+    return candidates[0][0]
+
+
+def in_lower(value, lower):
+    return value > lower[0] if lower[1] else value >= lower[0]
+
+
+def in_upper(value, upper):
+    return value < upper[0] if upper[1] else value <= upper[0]
+
+
+def apply(operands, replaced):
+    """
+    Returns operands with replacements, None in replacements means removal
+    """
+    if not replaced:
+        return operands
+    result = []
+    for i, operand in enumerate(operands):
+        if i in replaced:
+            operand = replaced[i]
+            if operand is None:
+                continue
+        result.append(operand)
+    return result
@@ -1,9 +1,13 @@
 from __future__ import unicode_literals
 
+import os
+import pickle
 import re
+import threading
 from decimal import Decimal
 
 import ply.yacc as yacc
+from django.conf import settings
 
 from .ast import *  # noqa
 from .compat import binary_type, text_type
@@ -28,47 +32,343 @@ def unescape_repl(m):
 def unescape(value):
     if isinstance(value, binary_type):
         value = value.decode('utf8')
-    return re.sub(unescape_pattern, unescape_repl, value)
+    if '\\' not in value:
+        return value
+    return unescape_pattern.sub(unescape_repl, value)
+
+
+ENGINES = ('ply', 'descent')
+
+_local = threading.local()
+
+
+def get_parser(engine=None):
+    """
+    Returns a ready-to-use parser owned by the current thread.
+
+    Building DjangoQLParser is expensive: PLY reflects on grammar docstrings,
+    checks parse tables signature and compiles lexer regexes. Parser instances
+    are stateful though, so they can't be shared between threads. This function
+    creates one parser per thread and re-uses it for subsequent calls.
+
+    :param engine: 'ply' or 'descent'. If not specified, it's taken from
+        DJANGOQL_PARSER_ENGINE setting, 'ply' by default or when Django
+        settings are not configured.
+    """
+    if engine is None:
+        engine = get_setting('DJANGOQL_PARSER_ENGINE', 'ply')
+    parsers = getattr(_local, 'parsers', None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    parser = parsers.get(engine)
+    if parser is None:
+        kwargs = {}
+        path = get_parse_tables_path()
+        if path and engine == 'ply':
+            kwargs['picklefile'] = path
+        parser = parsers[engine] = DjangoQLParser(engine=engine, **kwargs)
+    return parser
+
+
+def get_parse_tables_path():
+    """
+    Returns path of pickled parse tables from DJANGOQL_PARSE_TABLES setting,
+    or None if tables are loaded from djangoql/parsetab.py
+    """
+    return get_setting('DJANGOQL_PARSE_TABLES', None)
+
+
+def get_setting(name, default):
+    """
+    Returns Django setting, or the default if settings are not configured,
+    since the parser can be used without Django
+    """
+    if not settings.configured:
+        return default
+    return getattr(settings, name, default)
+
+
+def parse_tables_signature():
+    """
+    Returns signature of the grammar, which PLY stores in parsetab.py to find
+    out if parse tables are up to date
+    """
+    parser = DjangoQLParser(engine='descent')
+    pdict = dict((k, getattr(parser, k)) for k in dir(parser))
+    reflect = yacc.ParserReflect(pdict, log=yacc.NullLogger())
+    reflect.get_all()
+    return reflect.signature()
+
+
+def parse_tables_are_current(path=None):
+    """
+    Checks parse tables pickled to the path, or djangoql/parsetab.py if the
+    path is not given
+    """
+    if path:
+        try:
+            signature = yacc.LRTable().read_pickle(path)
+        except (ImportError, EOFError, pickle.UnpicklingError,
+                yacc.VersionError):
+            return False
+    else:
+        try:
+            from . import parsetab
+        except ImportError:
+            return False
+        signature = getattr(parsetab, '_lr_signature', None)
+    return signature == parse_tables_signature()
+
+
+def write_parse_tables(path=None):
+    """
+    Regenerates parse tables if they don't match the grammar. They're pickled
+    to the path if it's given, otherwise written to djangoql/parsetab.py.
+    """
+    if path:
+        kwargs = {'picklefile': path}
+    else:
+        kwargs = {'outputdir': os.path.dirname(os.path.abspath(__file__))}
+    yacc.yacc(
+        module=DjangoQLParser(engine='descent'),
+        debug=False,
+        write_tables=True,
+        **kwargs
+    )
+
+
+# Token types which can follow each comparison operator in the descent engine.
+# Must be kept in sync with the grammar of PLY engine below.
+EQUALITY_OPERATORS = ('EQUALS', 'NOT_EQUALS')
+ORDERING_OPERATORS = ('GREATER', 'GREATER_EQUAL', 'LESS', 'LESS_EQUAL')
+CONTAINS_OPERATORS = ('CONTAINS', 'NOT_CONTAINS', 'STARTSWITH')
+NUMBER_TOKENS = ('INT_VALUE', 'FLOAT_VALUE')
+CONST_TOKENS = NUMBER_TOKENS + ('STRING_VALUE', 'TRUE', 'FALSE', 'NONE')
+COMPARISON_VALUES = dict(
+    [(op, CONST_TOKENS) for op in EQUALITY_OPERATORS] +
+    [(op, NUMBER_TOKENS + ('STRING_VALUE',)) for op in ORDERING_OPERATORS] +
+    [(op, ('STRING_VALUE',)) for op in CONTAINS_OPERATORS]
+)
+LOGICAL_TOKENS = ('AND', 'OR')
+
+
+def const_value(token):
+    """
+    Converts a value token to Const node
+    """
+    if token.type == 'INT_VALUE':
+        return Const(value=int(token.value))
+    elif token.type == 'FLOAT_VALUE':
+        return Const(value=Decimal(token.value))
+    elif token.type == 'STRING_VALUE':
+        return Const(value=unescape(token.value))
+    elif token.type == 'TRUE':
+        return Const(value=True)
+    elif token.type == 'FALSE':
+        return Const(value=False)
+    return Const(value=None)
+
+
+def fold_logical(terms, operators):
+    """
+    Joins terms with logical operators. Logical operators have equal
+    precedence and are right-associative, that is how the grammar has always
+    grouped them: "a and b or c" means "a and (b or c)".
+
+    Runs of the same operator are collapsed into a single n-ary
+    LogicalExpression, and operands in parenthesis which use the same
+    operator are merged into it, since both are associative.
+    """
+    node = terms[-1]
+    i = len(operators) - 1
+    while i >= 0:
+        operator = operators[i]
+        operands = [node]
+        while i >= 0 and operators[i].operator == operator.operator:
+            operands.append(terms[i])
+            i -= 1
+        operands.reverse()
+        flat = []
+        for operand in operands:
+            if isinstance(operand, LogicalExpression) and \
+                    operand.operator.operator == operator.operator:
+                flat.extend(operand.operands)
+            else:
+                flat.append(operand)
+        node = LogicalExpression(operator=operator, operands=flat)
+    return node
 
 
 class DjangoQLParser(object):
-    def __init__(self, debug=False, **kwargs):
+    def __init__(self, debug=False, engine='ply', **kwargs):
+        if engine not in ENGINES:
+            raise ValueError(
+                'Unknown parser engine: %s. Possible choices are: %s' % (
+                    engine,
+                    ', '.join(ENGINES),
+                )
+            )
+        self.engine = engine
         self.default_lexer = DjangoQLLexer()
         self.tokens = self.default_lexer.tokens
-        kwargs['debug'] = debug
-        self.yacc = yacc.yacc(module=self, **kwargs)
+        if engine == 'ply':
+            kwargs['debug'] = debug
+            self.yacc = yacc.yacc(module=self, **kwargs)
+        else:
+            self.yacc = None
 
     def parse(self, input=None, lexer=None, **kwargs):
         lexer = lexer or self.default_lexer
+        if self.yacc is None:
+            return self.parse_descent(input=input, lexer=lexer)
         return self.yacc.parse(input=input, lexer=lexer, **kwargs)
 
+    def parse_descent(self, input, lexer):
+        """
+        Hand-written recursive descent engine, an alternative to PLY.
+
+        It accepts exactly the same language and produces the same AST as the
+        grammar below. Since both engines read tokens one by one and detect
+        an error on the first token which can't continue a valid query, they
+        also report the same syntax errors. Nested parenthesis are handled
+        with an explicit stack instead of recursion.
+        """
+        if input is not None:
+            lexer.input(input)
+        next_token = lexer.token
+        stack = []  # (terms, operators) of enclosing parenthesis
+        terms = []
+        operators = []
+        token = next_token()
+        while True:
+            # Term: either a comparison or an expression in parenthesis
+            while token is not None and token.type == 'PAREN_L':
+                stack.append((terms, operators))
+                terms = []
+                operators = []
+                token = next_token()
+            # "startswith" is an operator only after a name
+            if token is None or token.type not in ('NAME', 'STARTSWITH'):
+                self.descent_error(token, lexer)
+            name = Name(parts=token.value.split('.'))
+            token = next_token()
+            if token is None:
+                self.descent_error(token, lexer)
+            if token.type == 'IN':
+                comparison = Comparison(operator=token.value)
+                value = self.parse_descent_list(next_token, lexer)
+            elif token.type == 'NOT':
+                not_token = token
+                token = next_token()
+                if token is None or token.type not in ('IN', 'STARTSWITH'):
+                    self.descent_error(token, lexer)
+                comparison = Comparison(
+                    operator='%s %s' % (not_token.value, token.value),
+                )
+                if token.type == 'IN':
+                    value = self.parse_descent_list(next_token, lexer)
+                else:
+                    token = next_token()
+                    if token is None or token.type != 'STRING_VALUE':
+                        self.descent_error(token, lexer)
+                    value = const_value(token)
+            else:
+                allowed = COMPARISON_VALUES.get(token.type)
+                if allowed is None:
+                    self.descent_error(token, lexer)
+                comparison = Comparison(operator=token.value)
+                token = next_token()
+                if token is None or token.type not in allowed:
+                    self.descent_error(token, lexer)
+                value = const_value(token)
+            terms.append(
+                Expression(left=name, operator=comparison, right=value),
+            )
+            token = next_token()
+
+            # After a term: logical operator, closing paren or end of input
+            while True:
+                if token is not None and token.type in LOGICAL_TOKENS:
+                    operators.append(Logical(operator=token.value))
+                    token = next_token()
+                    break
+                if stack and token is not None and token.type == 'PAREN_R':
+                    node = fold_logical(terms, operators)
+                    terms, operators = stack.pop()
+                    terms.append(node)
+                    token = next_token()
+                elif not stack and token is None:
+                    return fold_logical(terms, operators)
+                else:
+                    self.descent_error(token, lexer)
+
+    def parse_descent_list(self, next_token, lexer):
+        token = next_token()
+        if token is None or token.type != 'PAREN_L':
+            self.descent_error(token, lexer)
+        items = []
+        while True:
+            token = next_token()
+            if token is None or token.type not in CONST_TOKENS:
+                self.descent_error(token, lexer)
+            items.append(const_value(token))
+            token = next_token()
+            if token is not None and token.type == 'PAREN_R':
+                return List(items=items)
+            if token is None or token.type != 'COMMA':
+                self.descent_error(token, lexer)
+
+    def descent_error(self, token, lexer):
+        # Mimic PLY, which attaches the lexer to the error token
+        if token is not None and not hasattr(token, 'lexer'):
+            token.lexer = lexer
+        self.p_error(token)
+
     start = 'expression'
 
-    def p_expression_parens(self, p):
+    def p_expression(self, p):
         """
-        expression : PAREN_L expression PAREN_R
+        expression : logical_chain
         """
-        p[0] = p[2]
+        p[0] = fold_logical(*p[1])
 
-    def p_expression_logical(self, p):
+    def p_logical_chain_term(self, p):
         """
-        expression : expression logical expression
+        logical_chain : term
         """
-        p[0] = Expression(left=p[1], operator=p[2], right=p[3])
+        p[0] = ([p[1]], [])
 
-    def p_expression_comparison(self, p):
+    def p_logical_chain(self, p):
         """
-        expression : name comparison_number number
-                   | name comparison_string string
-                   | name comparison_equality boolean_value
-                   | name comparison_equality none
-                   | name comparison_in_list const_list_value
+        logical_chain : logical_chain logical term
+        """
+        # Left-recursive rule, terms and operators are appended in place, so
+        # long chains are parsed in linear time without deep PLY stack
+        terms, operators = p[1]
+        terms.append(p[3])
+        operators.append(p[2])
+        p[0] = p[1]
+
+    def p_term_parens(self, p):
+        """
+        term : PAREN_L expression PAREN_R
+        """
+        p[0] = p[2]
+
+    def p_term_comparison(self, p):
+        """
+        term : name comparison_number number
+             | name comparison_string string
+             | name comparison_equality boolean_value
+             | name comparison_equality none
+             | name comparison_in_list const_list_value
         """
         p[0] = Expression(left=p[1], operator=p[2], right=p[3])
 
     def p_name(self, p):
         """
         name : NAME
+             | STARTSWITH
         """
         p[0] = Name(parts=p[1].split('.'))
 
@@ -114,8 +414,13 @@ class DjangoQLParser(object):
         """
         comparison_contains : CONTAINS
                             | NOT_CONTAINS
+                            | STARTSWITH
+                            | NOT STARTSWITH
         """
-        p[0] = Comparison(operator=p[1])
+        if len(p) == 2:
+            p[0] = Comparison(operator=p[1])
+        else:
+            p[0] = Comparison(operator='%s %s' % (p[1], p[2]))
 
     def p_comparison_in_list(self, p):
         """
@@ -189,7 +494,9 @@ class DjangoQLParser(object):
         """
         const_value_list : const_value_list COMMA const_value
         """
-        p[0] = p[1] + [p[3]]
+        # Append in place, copying the list here makes long lists quadratic
+        p[1].append(p[3])
+        p[0] = p[1]
 
     def p_const_value_list_single(self, p):
         """
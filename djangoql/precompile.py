@@ -0,0 +1,62 @@
+"""
+Schemas serialized ahead of time with djangoql_compile management command.
+
+Precompiled schemas are stored as JSON files in DJANGOQL_COMPILED_DIR, one
+file per schema class, model and encoding, and served by the introspection
+view instead of introspecting models in every worker.
+"""
+import hashlib
+import io
+import json
+import os
+
+from django.conf import settings
+
+
+def get_compiled_dir():
+    return getattr(settings, 'DJANGOQL_COMPILED_DIR', None)
+
+
+def compiled_schema_name(schema, compact=False):
+    """
+    Returns file name of precompiled schema
+    """
+    schema_class = '%s.%s' % (
+        schema.__class__.__module__,
+        schema.__class__.__name__,
+    )
+    return '%s-%s%s.json' % (
+        schema.model_label(schema.current_model),
+        hashlib.sha1(schema_class.encode('utf-8')).hexdigest()[:12],
+        '.compact' if compact else '',
+    )
+
+
+def compile_schema(schema, directory, compact=False, inline_options=False):
+    """
+    Writes serialized schema to the directory, returns the file path
+    """
+    if compact:
+        schema_dict = schema.as_compact_dict(inline_options=inline_options)
+    else:
+        schema_dict = schema.as_dict(inline_options=inline_options)
+    content = json.dumps(schema_dict, separators=(',', ':')).encode('utf-8')
+    path = os.path.join(directory, compiled_schema_name(schema, compact))
+    with io.open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def load_compiled_schema(schema, compact=False):
+    """
+    Returns precompiled schema content, or None if there's no such file
+    """
+    directory = get_compiled_dir()
+    if not directory:
+        return None
+    path = os.path.join(directory, compiled_schema_name(schema, compact))
+    try:
+        with io.open(path, 'rb') as f:
+            return f.read()
+    except IOError:
+        return None
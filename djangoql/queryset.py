@@ -1,19 +1,199 @@
-from django.db.models import QuerySet
+from collections import OrderedDict
 
-from .ast import Logical
-from .parser import DjangoQLParser
-from .schema import DjangoQLField, DjangoQLSchema
+import django
+from django.db.models import Q, QuerySet
+
+from .ast import Const, List, Logical, LogicalExpression
+from .cache import get_ast_cache
+from .optimizer import optimize
+from .parser import get_parser
+from .schema import MULTIVALUED_LOOKUPS, DjangoQLField, DjangoQLSchema
+
+
+# Exists() can be used in filters since Django 3.0
+USE_EXISTS = django.VERSION >= (3, 0)
+# QuerySet.union() was added in Django 1.11
+USE_UNION = hasattr(QuerySet, 'union')
+if USE_EXISTS:
+    from django.db.models import Exists, OuterRef
+
+POSITIVE_OPERATORS = {
+    '!=': '=',
+    '!~': '~',
+    'not in': 'in',
+    'not startswith': 'startswith',
+}
+
+
+class RelatedLookup(object):
+    """
+    Comparisons with fields of a many-to-many or reverse foreign key
+    relation, checked with a subquery on the model which has the relation
+    instead of joining it. EXISTS is used on Django 3.0+, and "pk IN" on
+    older versions. Rows are never duplicated, and negated comparisons
+    become NOT EXISTS.
+
+    :param model: model which has the relation
+    :param path: list of names leading to the model from the searched one
+    :param q: Q-object for the model
+    :param negated: boolean, if the subquery must not match
+    """
+    __slots__ = ('model', 'path', 'q', 'negated')
+
+    def __init__(self, model, path, q, negated=False):
+        self.model = model
+        self.path = path
+        self.q = q
+        self.negated = negated
+
+    def as_q(self):
+        pk = '__'.join(self.path + ['pk'])
+        queryset = self.model._base_manager.filter(self.q)
+        if USE_EXISTS:
+            q = Q(Exists(queryset.filter(pk=OuterRef(pk))))
+        else:
+            q = Q(**{'%s__in' % pk: queryset.values('pk')})
+        return ~q if self.negated else q
+
+
+def as_q(lookup):
+    if isinstance(lookup, RelatedLookup):
+        return lookup.as_q()
+    return lookup
+
+
+def merge_related_lookups(lookups, connector):
+    """
+    Merges positive related lookups of the same relation into one subquery,
+    so that they're matched by the same related object, like with a join
+    """
+    merged = []
+    positions = {}
+    for lookup in lookups:
+        if not isinstance(lookup, RelatedLookup) or lookup.negated:
+            merged.append(lookup)
+            continue
+        key = (lookup.model, tuple(lookup.path))
+        if key not in positions:
+            positions[key] = len(merged)
+            merged.append(lookup)
+            continue
+        first = merged[positions[key]]
+        q = Q(first.q, lookup.q)
+        q.connector = connector
+        merged[positions[key]] = RelatedLookup(
+            model=first.model,
+            path=first.path,
+            q=q,
+        )
+    return merged
+
+
+def use_subqueries(schema_instance):
+    mode = schema_instance.multivalued_lookups
+    if mode not in MULTIVALUED_LOOKUPS:
+        raise ValueError(
+            'Unknown multi-valued lookups mode: %s. '
+            'Possible choices are: %s' % (mode, ', '.join(MULTIVALUED_LOOKUPS))
+        )
+    return mode == 'subquery'
 
 
 def build_filter(expr, schema_instance):
-    if isinstance(expr.operator, Logical):
-        left = build_filter(expr.left, schema_instance)
-        right = build_filter(expr.right, schema_instance)
-        if expr.operator.operator == 'or':
-            return left | right
+    """
+    Builds Q object for given AST. Each logical expression becomes a single
+    flat Q with all its operands as children, and the tree is walked with
+    an explicit stack, so large generated queries are handled in linear time.
+    """
+    if isinstance(expr, Const):
+        # Optimized query which always or never matches
+        return Q() if expr.value else Q(pk__in=[])
+    if schema_instance.union_disjunctions and USE_UNION:
+        branches = get_union_branches(expr, schema_instance)
+        if branches:
+            return build_union(branches, schema_instance)
+    subqueries = use_subqueries(schema_instance)
+    results = []
+    stack = [(expr, False)]
+    while stack:
+        node, visited = stack.pop()
+        if not isinstance(node.operator, Logical):
+            results.append(build_lookup(node, schema_instance, subqueries))
+        elif not visited:
+            stack.append((node, True))
+            stack.extend((o, False) for o in reversed(node.operands))
+        else:
+            count = len(node.operands)
+            connector = Q.OR if node.operator.operator == 'or' else Q.AND
+            lookups = results[-count:]
+            if subqueries:
+                lookups = merge_related_lookups(lookups, connector)
+            q = Q(*[as_q(lookup) for lookup in lookups])
+            q.connector = connector
+            del results[-count:]
+            results.append(q)
+    return as_q(results[0])
+
+
+def get_relations(expr, schema_instance):
+    """
+    Returns a set of relation paths which comparisons in the AST go through,
+    an empty tuple stands for fields of the searched model
+    """
+    relations = set()
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node.operator, Logical):
+            stack.extend(node.operands)
+        elif schema_instance.resolve_name(node.left) is None:
+            # Comparison with a relation itself, like "author = None"
+            relations.add(node.left.parts)
         else:
-            return left & right
+            relations.add(node.left.parts[:-1])
+    return frozenset(relations)
+
+
+def get_union_branches(expr, schema_instance):
+    """
+    Splits top-level "or" into groups of operands which go through the same
+    relations. Returns a list of AST nodes for each group, or None if the
+    expression isn't a disjunction across different relations.
+    """
+    if not isinstance(expr.operator, Logical) or \
+            expr.operator.operator != 'or':
+        return None
+    groups = OrderedDict()
+    for operand in expr.operands:
+        relations = get_relations(operand, schema_instance)
+        groups.setdefault(relations, []).append(operand)
+    if len(groups) < 2:
+        return None
+    return [
+        operands[0] if len(operands) == 1
+        else LogicalExpression(operator=expr.operator, operands=operands)
+        for operands in groups.values()
+    ]
+
 
+def build_union(branches, schema_instance):
+    """
+    Builds Q-object which selects primary keys of objects matching any of the
+    branches with UNION of a subquery per branch
+    """
+    manager = schema_instance.current_model._base_manager
+    querysets = [
+        manager.filter(build_filter(branch, schema_instance)).values('pk')
+        for branch in branches
+    ]
+    return Q(pk__in=querysets[0].union(*querysets[1:]))
+
+
+def build_lookup(expr, schema_instance, subqueries=False):
+    """
+    Returns Q-object for a comparison, or RelatedLookup if subqueries are
+    enabled and the comparison crosses a multi-valued relation
+    """
     field = schema_instance.resolve_name(expr.left)
     if not field:
         # That must be a reference to a model without specifying a field.
@@ -22,21 +202,91 @@ def build_filter(expr, schema_instance):
             name=expr.left.parts[-1],
             nullable=True,
         )
-    return field.get_lookup(
-        path=expr.left.parts[:-1],
-        operator=expr.operator.operator,
-        value=expr.right.value,
+    path = list(expr.left.parts[:-1])
+    operator = expr.operator.operator
+    value = expr.right.value
+    if isinstance(expr.right, List):
+        # List values are tuples, since nodes are immutable, but lookups
+        # have always got lists
+        value = list(value)
+    index, relation = None, None
+    if subqueries:
+        index, relation = schema_instance.get_multivalued_relation(expr.left)
+    if relation is None:
+        return field.get_lookup(
+            path=path,
+            operator=operator,
+            value=value,
+        )
+    positive = POSITIVE_OPERATORS.get(operator, operator)
+    return RelatedLookup(
+        model=relation.model,
+        path=path[:index],
+        q=field.get_lookup(
+            path=path[index:],
+            operator=positive,
+            value=value,
+        ),
+        negated=positive != operator,
     )
 
 
+def needs_distinct(expr, schema_instance):
+    """
+    Checks if filtering with the AST may return duplicate rows, which happens
+    when it joins many-to-many or reverse foreign key relations
+    """
+    if isinstance(expr, Const) or use_subqueries(schema_instance):
+        return False
+    if schema_instance.union_disjunctions and USE_UNION and \
+            get_union_branches(expr, schema_instance):
+        return False
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node.operator, Logical):
+            stack.extend(node.operands)
+        elif node.operator.operator not in POSITIVE_OPERATORS and \
+                schema_instance.get_multivalued_relation(node.left)[0] \
+                is not None:
+            return True
+    return False
+
+
+def parse_search(search, schema_instance):
+    """
+    Parses search and validates it against given schema instance.
+
+    If DJANGOQL_AST_CACHE_SIZE setting is enabled, validated ASTs are cached
+    and shared between threads, so they must be treated as read-only. If
+    schema has optimize_queries enabled, the optimized AST is returned.
+    """
+    cache = get_ast_cache()
+    if cache is None:
+        return compile_search(search, schema_instance)
+    key = (schema_instance.__class__, schema_instance.current_model, search)
+    ast = cache.get(key)
+    if ast is None:
+        ast = compile_search(search, schema_instance)
+        cache.set(key, ast)
+    return ast
+
+
+def compile_search(search, schema_instance):
+    ast = get_parser().parse(search)
+    schema_instance.validate(ast)
+    if schema_instance.optimize_queries:
+        ast = optimize(ast, schema_instance)
+    return ast
+
+
 def apply_search(queryset, search, schema=None):
     """
     Applies search written in DjangoQL mini-language to given queryset
     """
-    ast = DjangoQLParser().parse(search)
     schema = schema or DjangoQLSchema
     schema_instance = schema(queryset.model)
-    schema_instance.validate(ast)
+    ast = parse_search(search, schema_instance)
     return queryset.filter(build_filter(ast, schema_instance))
 
 
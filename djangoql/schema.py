@@ -1,20 +1,170 @@
+import base64
 import inspect
-from collections import OrderedDict, deque
-from datetime import datetime
+import json
+import re
+import threading
+from collections import OrderedDict, deque, namedtuple
+from datetime import datetime, timedelta
 from decimal import Decimal
+from itertools import islice
 
+import django
 from django.conf import settings
 from django.db import models
 from django.db.models import FieldDoesNotExist, ManyToManyRel, ManyToOneRel
+from django.db.models.expressions import Expression
 from django.db.models.fields.related import ForeignObjectRel
+from django.utils.functional import Promise
 from django.utils.timezone import get_current_timezone
-from django.core.paginator import Paginator, EmptyPage
+from django.utils.translation import get_language
+from django.core.serializers.json import DjangoJSONEncoder
 
 from .ast import Comparison, Const, List, Logical, Name, Node
-from .compat import text_type
+from .cache import (
+    LRUCache, cached_options, introspection_cache, watch_model,
+)
+from .compat import PY2, Mapping, text_type
+from .contrib.suggestions.materialized import (
+    get_materialized_options, is_materialized,
+)
 from .exceptions import DjangoQLSchemaError
 
 
+def overrides(obj, base, method_name):
+    """
+    Checks if given method of base class is overridden in obj class
+    """
+    method = getattr(obj.__class__, method_name)
+    base_method = getattr(base, method_name)
+    return getattr(method, '__func__', method) is not \
+        getattr(base_method, '__func__', base_method)
+
+
+def encode_cursor(position):
+    """
+    Encodes pagination position as an opaque URL-safe string
+    """
+    data = json.dumps(position, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes pagination position encoded with encode_cursor()
+    """
+    try:
+        position = json.loads(
+            base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'),
+        )
+    except (AttributeError, TypeError, ValueError):
+        position = None
+    if not isinstance(position, dict):
+        raise DjangoQLSchemaError('Invalid cursor: %s' % cursor)
+    return position
+
+
+IN_LIST_STRATEGIES = ('chunked', 'array')
+MULTIVALUED_LOOKUPS = ('join', 'subquery')
+# Types of values passed to the database in a single array, bool is excluded
+# even though it's a subclass of int
+ARRAY_VALUE_TYPES = (int, long, text_type) if PY2 else (int, text_type)  # noqa
+# Internal types of model fields which store such values as is. Other fields,
+# like UUIDField or DateField, convert values with get_db_prep_value() before
+# they're sent to the database, so their values are never passed in arrays.
+ARRAY_FIELD_TYPES = (
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField',
+    'BigIntegerField', 'SmallIntegerField', 'PositiveIntegerField',
+    'PositiveSmallIntegerField', 'PositiveBigIntegerField', 'CharField',
+    'TextField', 'SlugField',
+)
+
+
+class ArrayValues(Expression):
+    """
+    Subquery selecting from a list of values which is passed to the database
+    as a single query parameter: a JSON array on SQLite and a native array on
+    PostgreSQL. Other backends get a regular list of placeholders.
+    """
+    def __init__(self, values, output_field=None):
+        super(ArrayValues, self).__init__(output_field=output_field)
+        self.values = values
+
+    @staticmethod
+    def wrap(sql):
+        # Lookups wrap the right hand side SQL in parenthesis before Django 3.0
+        return '(%s)' % sql if django.VERSION >= (3, 0) else sql
+
+    def as_sql(self, compiler, connection):
+        return self.wrap(', '.join(['%s'] * len(self.values))), \
+            list(self.values)
+
+    def as_sqlite(self, compiler, connection):
+        return self.wrap('SELECT value FROM json_each(%s)'), \
+            [json.dumps(self.values)]
+
+    def as_postgresql(self, compiler, connection):
+        return self.wrap('SELECT unnest(%s)'), [list(self.values)]
+
+
+PARTIAL_DATETIME_RE = re.compile(
+    r'^(\d{4})(?:-(\d\d?)(?:-(\d\d?)'
+    r'(?: (\d\d?)(?::(\d\d?)(?::(\d\d?))?)?)?)?)?$'
+)
+DATETIME_PRECISIONS = ('year', 'month', 'day', 'hour', 'minute', 'second')
+PERIOD_DELTAS = {
+    'day': timedelta(days=1),
+    'hour': timedelta(hours=1),
+    'minute': timedelta(minutes=1),
+    'second': timedelta(seconds=1),
+}
+# Results of parse_period() keyed by value. It's safe to share them between
+# queries, schemas and threads: they depend on the string only, consist of
+# immutable naive datetimes, and time zones are applied later by
+# PeriodField.convert(). The size bound keeps distinct user input from
+# growing it.
+parsed_periods = LRUCache(maxsize=1024)
+
+
+def parse_period(value):
+    """
+    Parses "YYYY[-MM[-DD[ HH[:MM[:SS]]]]]" into (start, end, precision), where
+    start and end are naive datetimes of the period, and end is excluded. End
+    is None if it doesn't fit into datetime. Raises ValueError for other
+    strings.
+
+    Results are memoized, values of a query are parsed for validation and
+    then again for lookups.
+    """
+    period = parsed_periods.get(value)
+    if period is not None:
+        return period
+    match = PARTIAL_DATETIME_RE.match(value)
+    if not match:
+        raise ValueError('Invalid date or timestamp: %s' % value)
+    parts = [int(p) for p in match.groups() if p is not None]
+    precision = DATETIME_PRECISIONS[len(parts) - 1]
+    start = datetime(*(parts + [1] * (3 - len(parts))))
+    try:
+        if precision == 'year':
+            end = start.replace(year=start.year + 1)
+        elif precision == 'month':
+            end = start.replace(year=start.year + start.month // 12,
+                                month=start.month % 12 + 1)
+        else:
+            end = start + PERIOD_DELTAS[precision]
+    except (ValueError, OverflowError):
+        end = None
+    period = (start, end, precision)
+    parsed_periods.set(value, period)
+    return period
+
+
+ChoicesIndex = namedtuple(
+    'ChoicesIndex',
+    ['labels', 'values_by_label', 'label_by_value'],
+)
+
+
 class DjangoQLField(object):
     """
     Abstract searchable field
@@ -27,6 +177,30 @@ class DjangoQLField(object):
     value_types = []
     value_types_description = ''
     suggest_options_page_size = 25
+    # Lookup for filtering options by the text typed by user, 'icontains' or
+    # 'istartswith'. The latter can use an index, see startswith_lookup below.
+    suggest_options_lookup = 'icontains'
+    # Lookup for "startswith" operator, 'istartswith' or 'startswith'. The
+    # default is case-insensitive and can't use a plain index on the column,
+    # on PostgreSQL it needs an index on UPPER(column::text) text_pattern_ops.
+    # The latter can use a btree index, with text_pattern_ops on PostgreSQL.
+    startswith_lookup = 'istartswith'
+    # Order of options: 'value' - distinct values in alphabetical order,
+    # 'frequency' - the most frequent values first
+    suggest_options_ranking = 'value'
+    # Max number of suggested options, None means no limit
+    suggest_options_limit = None
+    # Cache pages of options for this number of seconds, see DJANGOQL_CACHE
+    # setting. None disables caching.
+    suggest_options_cache_timeout = None
+    _choices_index = None
+    # How to query "in" and "not in" lists longer than in_list_threshold:
+    # None - a regular IN lookup, 'chunked' - OR of IN lookups with at most
+    # in_list_threshold items each, 'array' - single array parameter, see
+    # ArrayValues. Defaults to DJANGOQL_IN_LIST_STRATEGY and
+    # DJANGOQL_IN_LIST_THRESHOLD settings.
+    in_list_strategy = None
+    in_list_threshold = None
 
     def __init__(self, model=None, name=None, nullable=None,
                  suggest_options=None):
@@ -39,9 +213,16 @@ class DjangoQLField(object):
         if suggest_options is not None:
             self.suggest_options = suggest_options
 
-    def as_dict(self):
-        if self.suggest_options:
+    def as_dict(self, inline_options=True):
+        if self.suggest_options and inline_options:
             paginated_options = self.get_paginated_options()
+        elif self.suggest_options:
+            # Options are requested from the suggestions endpoint when needed
+            paginated_options = {
+                'has_more_options': True,
+                'next_options_page_number': 1,
+                'options': [],
+            }
         else:
             paginated_options = {
                 "has_next": False,
@@ -58,39 +239,204 @@ class DjangoQLField(object):
     def _field_choices(self):
         if self.model:
             try:
-                return self.model._meta.get_field(self.name).choices
+                return self.model._meta.get_field(self.name).flatchoices
             except FieldDoesNotExist:
                 pass
         return []
 
-    def get_paginated_options(self, page_number=1):
-        options = self.get_options()
-        p = Paginator(options, self.suggest_options_page_size)
+    def get_choices_index(self):
+        """
+        Returns ChoicesIndex for field choices, or None if there are no
+        choices. It's built once for each language, since choice labels
+        may be translated.
+        """
+        language = get_language()
         try:
-            page = p.page(page_number)
-            return {
-                "has_more_options": page.has_next(),
-                "next_options_page_number": page.next_page_number() if page.has_next() else None,
-                "options": list(page.object_list)
-            }
-        except EmptyPage:
-            return {
-                "has_more_options": False,
-                "next_options_page_number": None,
-                "options": []
-            }
+            return self._choices_index[language]
+        except (KeyError, TypeError):
+            pass
+        choices = self._field_choices()
+        index = None
+        if choices:
+            labels = []
+            values_by_label = {}
+            label_by_value = {}
+            for value, label in choices:
+                if isinstance(label, Promise):
+                    label = text_type(label)
+                if label not in values_by_label:
+                    labels.append(label)
+                    values_by_label[label] = []
+                values_by_label[label].append(value)
+                label_by_value.setdefault(value, label)
+            index = ChoicesIndex(
+                labels=tuple(labels),
+                values_by_label=values_by_label,
+                label_by_value=label_by_value,
+            )
+        if self._choices_index is None:
+            self._choices_index = {}
+        self._choices_index[language] = index
+        return index
+
+    @cached_options
+    def get_paginated_options(self, page_number=1, search=None):
+        """
+        Returns a page of suggestion options by page number. Pages are sliced
+        from options with one extra item to find out if there's a next page,
+        so options are never counted.
+        """
+        options = self.get_options()
+        if search:
+            options = self.filter_options(options, search)
+        options = self.limit_options(options)
+        page_size = self.suggest_options_page_size
+        page_number = int(page_number)
+        if page_number < 1:
+            page = []
+        else:
+            offset = (page_number - 1) * page_size
+            page = list(options[offset:offset + page_size + 1])
+        has_next = len(page) > page_size
+        return {
+            "has_more_options": has_next,
+            "next_options_page_number": page_number + 1 if has_next else None,
+            "options": page[:page_size],
+        }
+
+    @cached_options
+    def get_options_page(self, cursor=None, search=None):
+        """
+        Returns a page of suggestion options after given cursor, with an
+        opaque cursor of the next page in "next_cursor".
+
+        If options are a queryset ordered by this field, the next page is
+        selected with a filter on the last option value (keyset pagination),
+        so that deep pages are as fast as the first one. Other options are
+        sliced by offset. Options are never counted, one extra option is
+        fetched to find out if there are more of them. NULL is excluded from
+        querysets of values in both cases, it's suggested as None anyway.
+        """
+        options = self.get_options()
+        if search:
+            options = self.filter_options(options, search)
+        if isinstance(options, models.QuerySet) and \
+                len(getattr(options, '_fields', None) or ()) == 1:
+            options = options.filter(
+                **{'%s__isnull' % self.get_options_column(options): False}
+            )
+        position = decode_cursor(cursor) if cursor else {}
+        limit = self.suggest_options_page_size
+        ordering = None
+        if self.suggest_options_limit is None:
+            ordering = self.get_keyset_ordering(options)
+        else:
+            # Limited options are cheap to paginate by offset
+            options = self.limit_options(options)
+        if ordering is not None and 'offset' not in position:
+            column = ordering.lstrip('-')
+            if 'after' in position:
+                op = '__lt' if ordering.startswith('-') else '__gt'
+                options = options.filter(
+                    **{'%s%s' % (column, op): position['after']}
+                )
+            page = list(options[:limit + 1])
+            next_position = {'after': page[-2]} if len(page) > limit else None
+        else:
+            offset = int(position.get('offset', 0))
+            page = list(options[offset:offset + limit + 1])
+            next_position = {'offset': offset + limit}
+        has_more = len(page) > limit
+        return {
+            'has_more_options': has_more,
+            'next_cursor': encode_cursor(next_position) if has_more else None,
+            'options': page[:limit],
+        }
+
+    def get_keyset_ordering(self, options):
+        """
+        Returns ordering of options if they can be paginated by option values,
+        that is for a flat list of values of one column ordered by it.
+        Otherwise returns None.
+        """
+        if not isinstance(options, models.QuerySet):
+            return None
+        fields = tuple(getattr(options, '_fields', None) or ())
+        if len(fields) != 1:
+            return None
+        order_by = tuple(options.query.order_by)
+        if order_by in ((fields[0],), ('-%s' % fields[0],)):
+            return order_by[0]
+        return None
+
+    def get_options_column(self, options):
+        """
+        Returns the name of the column with option values in options queryset
+        """
+        fields = tuple(getattr(options, '_fields', None) or ())
+        return fields[0] if len(fields) == 1 else self.name
 
     def get_options(self):
         """
         Override this method to provide custom suggestion options
         """
-        choices = self._field_choices()
+        choices = self.get_choices_index()
         if choices:
-            return [c[1] for c in choices]
+            return list(choices.labels)
+        elif is_materialized(self.model, self.name):
+            return get_materialized_options(
+                self.model,
+                self.name,
+                ranking=self.suggest_options_ranking,
+            )
+        elif self.suggest_options_ranking == 'frequency':
+            return self.model.objects.\
+                values(self.name).\
+                annotate(djangoql_frequency=models.Count('pk')).\
+                order_by('-djangoql_frequency', self.name).\
+                values_list(self.name, flat=True)
         else:
             return self.model.objects.\
                 order_by(self.name).\
-                values_list(self.name, flat=True)
+                values_list(self.name, flat=True).\
+                distinct()
+
+    def limit_options(self, options):
+        """
+        Limits options to the first suggest_options_limit of them
+        """
+        if self.suggest_options_limit is None:
+            return options
+        return options[:self.suggest_options_limit]
+
+    def filter_options(self, options, search):
+        """
+        Filters suggestion options by the text typed by user.
+
+        Querysets are filtered in the database with suggest_options_lookup,
+        other options are filtered in Python the same way. Override this
+        method if get_options() returns a queryset which can't be filtered
+        by its values column, see get_options_column().
+        """
+        lookup = self.suggest_options_lookup
+        if isinstance(options, models.QuerySet):
+            column = self.get_options_column(options)
+            return options.filter(**{'%s__%s' % (column, lookup): search})
+        ignore_case = lookup.startswith('i')
+        if ignore_case:
+            search = search.lower()
+        result = []
+        for option in options:
+            text = text_type(option)
+            if ignore_case:
+                text = text.lower()
+            if lookup.endswith('startswith'):
+                matches = text.startswith(search)
+            else:
+                matches = search in text
+            if matches:
+                result.append(option)
+        return result
 
     def get_lookup_name(self):
         """
@@ -102,14 +448,20 @@ class DjangoQLField(object):
         """
         Override this method to convert displayed values to lookup values
         """
-        choices = self._field_choices()
+        choices = self.get_choices_index()
         if choices:
-            if isinstance(value, list):
-                return [c[0] for c in choices if c[1] in value]
-            else:
-                for c in choices:
-                    if c[1] == value:
-                        return c[0]
+            values_by_label = choices.values_by_label
+            if isinstance(value, (list, tuple)):
+                result = []
+                seen = set()
+                for label in value:
+                    for v in values_by_label.get(label, ()):
+                        if v not in seen:
+                            seen.add(v)
+                            result.append(v)
+                return result
+            elif value in values_by_label:
+                return values_by_label[value][0]
         return value
 
     def get_operator(self, operator):
@@ -129,6 +481,7 @@ class DjangoQLField(object):
             '<=': '__lte',
             '~': '__icontains',
             'in': '__in',
+            'startswith': '__%s' % self.startswith_lookup,
         }.get(operator)
         if op is not None:
             return op, False
@@ -136,6 +489,7 @@ class DjangoQLField(object):
             '!=': '',
             '!~': '__icontains',
             'not in': '__in',
+            'not startswith': '__%s' % self.startswith_lookup,
         }[operator]
         return op, True
 
@@ -152,18 +506,71 @@ class DjangoQLField(object):
             current field instance itself.
         :param operator: a string with comparison operator. It could be one of
             the following: '=', '!=', '>', '>=', '<', '<=', '~', '!~', 'in',
-            'not in'. Depending on the field type, some operators may be
-            excluded. '~' and '!~' can be applied to StrField only and aren't
-            allowed for any other fields. BoolField can't be used with less or
-            greater operators, '>', '>=', '<' and '<=' are excluded for it.
+            'not in', 'startswith', 'not startswith'. Depending on the field
+            type, some operators may be excluded. '~', '!~', 'startswith' and
+            'not startswith' can be applied to string values only. BoolField
+            can't be used with less or greater operators, '>', '>=', '<' and
+            '<=' are excluded for it.
         :param value: value passed for comparison
         :return: Q-object
         """
         search = '__'.join(path + [self.get_lookup_name()])
         op, invert = self.get_operator(operator)
-        q = models.Q(**{'%s%s' % (search, op): self.get_lookup_value(value)})
+        value = self.get_lookup_value(value)
+        if op == '__in':
+            q = self.get_in_list_lookup(search, value)
+        else:
+            q = models.Q(**{'%s%s' % (search, op): value})
         return ~q if invert else q
 
+    def get_in_list_lookup(self, search, values):
+        """
+        Builds Q-object for "in" lookup, applying in_list_strategy to lists
+        longer than in_list_threshold
+        """
+        strategy = self.in_list_strategy or \
+            getattr(settings, 'DJANGOQL_IN_LIST_STRATEGY', None)
+        threshold = self.in_list_threshold or \
+            getattr(settings, 'DJANGOQL_IN_LIST_THRESHOLD', 1000)
+        if strategy is None or len(values) <= threshold:
+            return models.Q(**{'%s__in' % search: values})
+        if strategy not in IN_LIST_STRATEGIES:
+            raise ValueError(
+                'Unknown "in" list strategy: %s. Possible choices are: %s' % (
+                    strategy,
+                    ', '.join(IN_LIST_STRATEGIES),
+                )
+            )
+        if strategy == 'array' and self.accepts_array() and all(
+                isinstance(v, ARRAY_VALUE_TYPES) and not isinstance(v, bool)
+                for v in values):
+            return models.Q(**{'%s__in' % search: ArrayValues(list(values))})
+        # Values which can't be passed in array go in chunks
+        q = models.Q(*[
+            models.Q(**{'%s__in' % search: values[i:i + threshold]})
+            for i in range(0, len(values), threshold)
+        ])
+        q.connector = models.Q.OR
+        return q
+
+    def accepts_array(self):
+        """
+        Whether values of "in" lists can be passed in a single array. Only
+        integer and plain text model fields looked up by name accept them,
+        because values in arrays bypass get_db_prep_value() of the field.
+        """
+        if not self.model:
+            return False
+        try:
+            field = self.model._meta.get_field(self.get_lookup_name())
+        except FieldDoesNotExist:
+            return False
+        if not getattr(field, 'concrete', False):
+            return False
+        if field.is_relation:
+            field = field.target_field
+        return field.get_internal_type() in ARRAY_FIELD_TYPES
+
     def validate(self, value):
         if not self.nullable and value is None:
             raise DjangoQLSchemaError(
@@ -215,80 +622,106 @@ class BoolField(DjangoQLField):
     value_types_description = 'True or False'
 
 
-class DateField(DjangoQLField):
-    type = 'date'
+class PeriodField(DjangoQLField):
+    """
+    Base class for date and time fields. Their values may be partial, like
+    "2017" or "2017-01-30 12", and then they stand for the whole period.
+    "=", "~", "startswith", "in" and their negations match any moment of the
+    period with a half-open range, which can use an index, and other
+    comparisons use its start.
+    """
     value_types = [text_type]
-    value_types_description = 'dates in "YYYY-MM-DD" format'
+    # Allowed precisions of values, see DATETIME_PRECISIONS
+    precisions = ()
+    # Precisions of values which are compared with "=" as is, not as ranges
+    exact_precisions = ()
 
     def validate(self, value):
-        super(DateField, self).validate(value)
+        super(PeriodField, self).validate(value)
         try:
             self.get_lookup_value(value)
         except ValueError:
             raise DjangoQLSchemaError(
-                'Field "%s" can be compared to dates in '
-                '"YYYY-MM-DD" format, but not to %s' % (
+                'Field "%s" can be compared to %s, but not to %s' % (
                     self.name,
+                    self.value_types_description,
                     repr(value),
                 )
             )
 
-    def get_lookup_value(self, value):
-        if not value:
-            return None
-        return datetime.strptime(value, '%Y-%m-%d').date()
-
-
-class DateTimeField(DjangoQLField):
-    type = 'datetime'
-    value_types = [text_type]
-    value_types_description = 'timestamps in "YYYY-MM-DD HH:MM" format'
+    def get_period(self, value):
+        start, end, precision = parse_period(value)
+        if precision not in self.precisions:
+            raise ValueError('Invalid value: %s' % value)
+        return (
+            self.convert(start),
+            None if end is None else self.convert(end),
+            precision,
+        )
 
-    def validate(self, value):
-        super(DateTimeField, self).validate(value)
-        try:
-            self.get_lookup_value(value)
-        except ValueError:
-            raise DjangoQLSchemaError(
-                'Field "%s" can be compared to timestamps in '
-                '"YYYY-MM-DD HH:MM" format, but not to %s' % (
-                    self.name,
-                    repr(value),
-                )
-            )
+    def convert(self, value):
+        """
+        Converts naive datetime to the lookup value
+        """
+        return value
 
     def get_lookup_value(self, value):
         if not value:
             return None
-        mask = '%Y-%m-%d'
-        if len(value) > 10:
-            mask += ' %H:%M'
-        if len(value) > 16:
-            mask += ':%S'
-        dt = datetime.strptime(value, mask)
-        if settings.USE_TZ:
-            dt = dt.replace(tzinfo=get_current_timezone())
-        return dt
+        return self.get_period(value)[0]
 
     def get_lookup(self, path, operator, value):
+        if not value or operator in ('>', '>=', '<', '<='):
+            return super(PeriodField, self).get_lookup(path, operator, value)
         search = '__'.join(path + [self.get_lookup_name()])
-        op, invert = self.get_operator(operator)
+        exact = operator not in ('~', '!~', 'startswith', 'not startswith')
+        lookups = []
+        values = value if isinstance(value, (list, tuple)) else [value]
+        for v in values:
+            if not v:
+                lookups.append(models.Q(**{search: None}))
+                continue
+            start, end, precision = self.get_period(v)
+            if exact and precision in self.exact_precisions:
+                lookups.append(models.Q(**{search: start}))
+            elif end is None:
+                # The period lasts till the end of time
+                lookups.append(models.Q(**{'%s__gte' % search: start}))
+            else:
+                lookups.append(models.Q(**{
+                    '%s__gte' % search: start,
+                    '%s__lt' % search: end,
+                }))
+        if len(lookups) == 1:
+            q = lookups[0]
+        else:
+            q = models.Q(*lookups)
+            q.connector = models.Q.OR
+        if operator in ('!=', '!~', 'not in', 'not startswith'):
+            return ~q
+        return q
 
-        # Add LIKE operator support for datetime fields. For LIKE comparisons
-        # we don't want to convert source value to datetime instance, because
-        # it would effectively kill the idea. What we want is expressions like
-        #       'created ~ "2017-01-30'
-        # to be translated to
-        #       'created LIKE %2017-01-30%',
-        # but it would work only if we pass a string as a parameter. If we pass
-        # a datetime instance, it would add time part in a form of 00:00:00,
-        # and resulting comparison would look like
-        #       'created LIKE %2017-01-30 00:00:00%'
-        # which is not what we want for this case.
-        val = value if operator in ('~', '!~') else self.get_lookup_value(value)
-
-        q = models.Q(**{'%s%s' % (search, op): val})
-        return ~q if invert else q
+
+class DateField(PeriodField):
+    type = 'date'
+    value_types_description = 'dates in "YYYY-MM-DD" format'
+    precisions = ('year', 'month', 'day')
+    exact_precisions = ('day',)
+
+    def convert(self, value):
+        return value.date()
+
+
+class DateTimeField(PeriodField):
+    type = 'datetime'
+    value_types_description = 'timestamps in "YYYY-MM-DD HH:MM" format'
+    precisions = DATETIME_PRECISIONS
+    exact_precisions = ('minute', 'second')
+
+    def convert(self, value):
+        if settings.USE_TZ:
+            return value.replace(tzinfo=get_current_timezone())
+        return value
 
 
 class RelationField(DjangoQLField):
@@ -308,16 +741,181 @@ class RelationField(DjangoQLField):
     def relation(self):
         return DjangoQLSchema.model_label(self.related_model)
 
-    def as_dict(self):
-        dikt = super(RelationField, self).as_dict()
+    @property
+    def multivalued(self):
+        """
+        True for many-to-many and reverse foreign key relations, and for
+        custom relations which aren't model fields
+        """
+        try:
+            field = self.model._meta.get_field(self.name)
+        except FieldDoesNotExist:
+            return True
+        return getattr(field, 'many_to_many', True) or \
+            getattr(field, 'one_to_many', True)
+
+    def as_dict(self, inline_options=True):
+        dikt = super(RelationField, self).as_dict(
+            inline_options=inline_options,
+        )
         dikt['relation'] = self.relation
         return dikt
 
 
+COMPACT_NULLABLE = 1
+COMPACT_SUGGEST = 2
+COMPACT_HAS_MORE_OPTIONS = 4
+COMPACT_FIELD_KEYS = frozenset([
+    'type', 'nullable', 'relation', 'options', 'has_more_options',
+    'next_options_page_number', 'has_next', 'next_page_number',
+])
+
+
+def compact_schema(schema_dict):
+    """
+    Encodes a result of DjangoQLSchema.as_dict() for large schemas.
+
+    Model labels and field types are listed once and referenced by index.
+    Each model is a list of fields, and each field is a list of its name,
+    type index and flags (COMPACT_NULLABLE, COMPACT_SUGGEST,
+    COMPACT_HAS_MORE_OPTIONS), optionally followed by an index of the related
+    model label, a list of options and an object with any other keys:
+
+        {
+            "format": "compact",
+            "labels": ["core.book", "auth.user"],
+            "types": ["str", "relation"],
+            "current_model": 0,
+            "models": [[["name", 0, 0], ["author", 1, 0, 1]], [...]]
+        }
+
+    Pagination keys other than has_more_options are not included.
+    """
+    labels = list(schema_dict['models'])
+    label_index = dict((label, i) for i, label in enumerate(labels))
+    types = []
+    type_index = {}
+
+    def intern_label(label):
+        if label not in label_index:
+            label_index[label] = len(labels)
+            labels.append(label)
+        return label_index[label]
+
+    models = []
+    for model_label, fields in schema_dict['models'].items():
+        compact_fields = []
+        for name, field in fields.items():
+            field_type = field['type']
+            if field_type not in type_index:
+                type_index[field_type] = len(types)
+                types.append(field_type)
+            options = field.get('options') or []
+            has_more = bool(field.get('has_more_options'))
+            flags = 0
+            if field.get('nullable'):
+                flags |= COMPACT_NULLABLE
+            if options or has_more:
+                flags |= COMPACT_SUGGEST
+            if has_more:
+                flags |= COMPACT_HAS_MORE_OPTIONS
+            compact = [name, type_index[field_type], flags]
+            if field.get('relation') is not None:
+                compact.append(intern_label(field['relation']))
+            if options:
+                compact.append(list(options))
+            extra = dict(
+                (k, v) for k, v in field.items() if k not in COMPACT_FIELD_KEYS
+            )
+            if extra:
+                compact.append(extra)
+            compact_fields.append(compact)
+        models.append(compact_fields)
+    return {
+        'format': 'compact',
+        'labels': labels,
+        'types': types,
+        'current_model': intern_label(schema_dict['current_model']),
+        'models': models,
+    }
+
+
+class LazyModels(Mapping):
+    """
+    Read-only mapping of model labels to their fields, which runs schema
+    introspection only as far as needed to find the requested model.
+
+    Introspection is a breadth-first walk, and fields of each model depend on
+    the models visited before it, so the walk is advanced in the same order
+    until the requested model is reached. The result is exactly the same as
+    with eager introspection. Iteration walks the whole graph.
+
+    If the walk fails, for instance on a database error, it's restarted on
+    the next lookup. Models found before are kept, the walk yields them in
+    the same order again.
+    """
+    def __init__(self, make_walk):
+        self._make_walk = make_walk
+        self._walk = make_walk()
+        self._models = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _advance(self, model_label=None):
+        with self._lock:
+            while self._walk is not None and (
+                    model_label is None or model_label not in self._models):
+                try:
+                    label, fields = next(self._walk)
+                except StopIteration:
+                    self._walk = None
+                except Exception:
+                    # A generator which raised is finished, so start over
+                    self._walk = self._make_walk()
+                    raise
+                else:
+                    self._models.setdefault(label, fields)
+
+    def __getitem__(self, model_label):
+        if model_label not in self._models:
+            self._advance(model_label)
+        return self._models[model_label]
+
+    def __contains__(self, model_label):
+        if model_label not in self._models:
+            self._advance(model_label)
+        return model_label in self._models
+
+    def __iter__(self):
+        self._advance()
+        return iter(self._models)
+
+    def __len__(self):
+        self._advance()
+        return len(self._models)
+
+
 class DjangoQLSchema(object):
     include = ()  # models to include into introspection
     exclude = ()  # models to exclude from introspection
     suggest_options = None
+    # Share introspection results between all instances of this schema class,
+    # see get_introspection_cache_key()
+    cache_introspection = True
+    # Introspect related models only when they're referenced, see LazyModels
+    lazy_introspection = True
+    # Number of options checked to detect string options, see
+    # has_string_options()
+    options_sample_size = 10
+    # Rewrite validated queries into equivalent cheaper ones, see
+    # djangoql.optimizer
+    optimize_queries = False
+    # How comparisons with fields of many-to-many and reverse foreign key
+    # relations are queried: 'join' or 'subquery', see
+    # djangoql.queryset.RelatedLookup
+    multivalued_lookups = 'join'
+    # Query top-level "or" of comparisons through different relations as
+    # UNION of subqueries, see djangoql.queryset.build_union()
+    union_disjunctions = False
 
     def __init__(self, model):
         if not inspect.isclass(model) or not issubclass(model, models.Model):
@@ -346,13 +944,38 @@ class DjangoQLSchema(object):
 
     @property
     def models(self):
-        if not self._models:
-            self._models = self.introspect(
-                model=self.current_model,
-                exclude=tuple(self.model_label(m) for m in self.exclude),
-            )
+        if self._models is None:
+            key = None
+            if self.cache_introspection:
+                key = self.get_introspection_cache_key()
+            if key is not None:
+                self._models = introspection_cache.get(key)
+            if self._models is None:
+                exclude = tuple(self.model_label(m) for m in self.exclude)
+                if self.lazy_introspection and \
+                        not overrides(self, DjangoQLSchema, 'introspect'):
+                    self._models = LazyModels(
+                        lambda: self.walk_models(self.current_model, exclude),
+                    )
+                else:
+                    self._models = self.introspect(
+                        model=self.current_model,
+                        exclude=exclude,
+                    )
+                if key is not None:
+                    introspection_cache[key] = self._models
         return self._models
 
+    def get_introspection_cache_key(self):
+        """
+        Returns a key for the process-wide cache of introspection results.
+
+        Override this method if introspection depends on something besides
+        the schema class and the model, like the current user. Return None to
+        skip the cache for this schema instance.
+        """
+        return self.__class__, self.current_model
+
     @classmethod
     def model_label(self, model):
         return text_type(model._meta)
@@ -363,9 +986,14 @@ class DjangoQLSchema(object):
 
         Returns a dict with all model labels and their fields found.
         """
-        result = {}
+        return dict(self.walk_models(model, exclude))
+
+    def walk_models(self, model, exclude=()):
+        """
+        Generates (model label, fields) pairs in the order of introspection
+        """
         open_set = deque([model])
-        closed_set = list(exclude)
+        closed_set = set(exclude)
 
         while open_set:
             model = open_set.popleft()
@@ -380,6 +1008,10 @@ class DjangoQLSchema(object):
                     field = self.get_field_instance(model, field)
                 if not field:
                     continue
+                if field.suggest_options_cache_timeout is not None and \
+                        field.model is not None:
+                    # Connect invalidation before options are cached
+                    watch_model(field.model)
                 if isinstance(field, RelationField):
                     if field.relation not in closed_set:
                         model_fields[field.name] = field
@@ -387,10 +1019,8 @@ class DjangoQLSchema(object):
                 else:
                     model_fields[field.name] = field
 
-            result[model_label] = model_fields
-            closed_set.append(model_label)
-
-        return result
+            closed_set.add(model_label)
+            yield model_label, model_fields
 
     def get_fields(self, model):
         """
@@ -427,13 +1057,33 @@ class DjangoQLSchema(object):
         )
         field_instance = field_cls(**field_kwargs)
         # Check if suggested options conflict with field type
-        if field_cls != StrField and field_instance.suggest_options:
-            for option in field_instance.get_options():
-                if isinstance(option, text_type):
-                    # Convert to StrField
-                    field_instance = StrField(**field_kwargs)
+        if field_cls != StrField and field_instance.suggest_options and \
+                self.has_string_options(field_instance):
+            field_instance = StrField(**field_kwargs)
         return field_instance
 
+    def has_string_options(self, field_instance):
+        """
+        Checks if suggested options of a non-string field are strings.
+
+        Choices are checked by their labels. Options of typed fields which
+        come from the database column can't be strings. In other cases only a
+        small sample of options is checked, so that the table is never
+        scanned during schema construction.
+        """
+        choices = field_instance.get_choices_index()
+        if choices:
+            return any(isinstance(l, text_type) for l in choices.labels)
+        if field_instance.type != 'unknown' and \
+                not overrides(field_instance, DjangoQLField, 'get_options'):
+            return False
+        options = field_instance.get_options()
+        if isinstance(options, models.QuerySet):
+            options = options.order_by()[:self.options_sample_size]
+        else:
+            options = islice(options, self.options_sample_size)
+        return any(isinstance(option, text_type) for option in options)
+
     def get_field_cls(self, field):
         str_fields = (models.CharField, models.TextField, models.UUIDField)
         if isinstance(field, str_fields):
@@ -450,17 +1100,30 @@ class DjangoQLSchema(object):
             return DateField
         return DjangoQLField
 
-    def as_dict(self):
-        models = {}
+    def as_dict(self, inline_options=True):
+        """
+        Returns the schema for the completion widget. With inline_options
+        set to False suggestion options are not included, so the result
+        doesn't depend on data and no queries are made.
+        """
+        models = OrderedDict()
         for model_label, fields in self.models.items():
-            models[model_label] = OrderedDict(
-                [(name, field.as_dict()) for name, field in fields.items()]
-            )
+            models[model_label] = OrderedDict([
+                (name, field.as_dict(inline_options=inline_options))
+                for name, field in fields.items()
+            ])
         return {
             'current_model': self.model_label(self.current_model),
             'models': models,
         }
 
+    def as_compact_dict(self, inline_options=True):
+        """
+        Returns the same schema as as_dict() in compact encoding, see
+        compact_schema()
+        """
+        return compact_schema(self.as_dict(inline_options=inline_options))
+
     def resolve_name(self, name):
         assert isinstance(name, Name)
         model = self.model_label(self.current_model)
@@ -479,15 +1142,37 @@ class DjangoQLSchema(object):
                 field = None
         return field
 
+    def get_multivalued_relation(self, name):
+        """
+        Returns the first many-to-many or reverse foreign key relation in the
+        name with its index in name parts, or (None, None) if there's none
+        """
+        model = self.model_label(self.current_model)
+        for i, name_part in enumerate(name.parts):
+            field = self.models[model].get(name_part)
+            if not isinstance(field, RelationField):
+                break
+            if field.multivalued:
+                return i, field
+            model = field.relation
+        return None, None
+
     def validate(self, node):
         """
         Validate DjangoQL AST tree vs. current schema
         """
         assert isinstance(node, Node)
-        if isinstance(node.operator, Logical):
-            self.validate(node.left)
-            self.validate(node.right)
-            return
+        # Walk the tree with an explicit stack, generated queries can be
+        # nested deeper than the recursion limit
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node.operator, Logical):
+                stack.extend(reversed(node.operands))
+            else:
+                self.validate_comparison(node)
+
+    def validate_comparison(self, node):
         assert isinstance(node.left, Name)
         assert isinstance(node.operator, Comparison)
         assert isinstance(node.right, (Const, List))
@@ -61,6 +61,9 @@
   lexer.addRule(new RegExp('in' + reNotFollowedByName), function (l) {
     return token('IN', l);
   });
+  lexer.addRule(new RegExp('startswith' + reNotFollowedByName), function (l) {
+    return token('STARTSWITH', l);
+  });
   lexer.addRule(new RegExp('True' + reNotFollowedByName), function (l) {
     return token('TRUE', l);
   });
@@ -89,10 +92,17 @@
   lexer.addRule(/!~/, function (l) { return token('NOT_CONTAINS', l); });
   lexer.lexAll = function () {
     var match;
+    var previous;
     var result = [];
     while (match = this.lex()) {  // eslint-disable-line no-cond-assign
       match.start = this.index - match.value.length;
       match.end = this.index;
+      previous = result[result.length - 1];
+      if (match.name === 'STARTSWITH' && !(previous &&
+          ['NAME', 'NOT'].indexOf(previous.name) >= 0)) {
+        // "startswith" is an operator only after a name
+        match.name = 'NAME';
+      }
       result.push(match);
     }
     return result;
@@ -125,6 +135,12 @@
     this.valuesCaseSensitive = false;
     this.highlightCaseSensitive = true;
 
+    // Options loaded from the server for (model, field, prefix)
+    this.remoteOptions = {};
+    this.loadingOptions = {};
+    // Requests for options waiting to be sent in one batch
+    this.pendingOptions = [];
+
     this.textarea = null;
     this.completion = null;
     this.completionUL = null;
@@ -167,6 +183,9 @@
     this.debouncedRenderCompletion = this.debounce(
         this.renderCompletion.bind(this),
         50);
+    this.debouncedLoadRemoteOptions = this.debounce(
+        this.loadRemoteOptions.bind(this),
+        300);
 
     // Bind event handlers and initialize completion & textSize containers
     this.textarea.setAttribute('autocomplete', 'off');
@@ -261,23 +280,47 @@
     loadIntrospections: function (introspections) {
       var onLoadError;
       var request;
+      var etag;
+      var cached;
+      var etagKey;
       if (typeof introspections === 'string') {
         // treat as URL
         onLoadError = function () {
           this.logError('failed to load introspections from ' + introspections);
         }.bind(this);
+        // Schema saved by a previous page load is validated with its ETag.
+        // Relative URLs are the same for all admins, so the key is absolute
+        etagKey = 'djangoql:etag:' + this.absoluteUrl(introspections);
+        etag = this.storageGet(etagKey);
+        cached = etag && this.storageGet('djangoql:schema:' + etag);
         request = new XMLHttpRequest();
         request.open('GET', introspections, true);
+        if (cached) {
+          request.setRequestHeader('If-None-Match', etag);
+        }
         request.onload = function () {
           var data;
+          var newEtag;
           if (request.status === 200) {
             data = JSON.parse(request.responseText);
-            this.currentModel = data.current_model;
-            this.models = data.models;
-            this.loadExtraSuggestions();
+            newEtag = request.getResponseHeader('ETag');
+            if (newEtag) {
+              if (etag && etag !== newEtag) {
+                this.storageRemove('djangoql:schema:' + etag);
+              }
+              this.storageSet('djangoql:schema:' + newEtag,
+                  request.responseText);
+              this.storageSet(etagKey, newEtag);
+            }
+          } else if (request.status === 304 && cached) {
+            data = JSON.parse(cached);
           } else {
             onLoadError();
+            return;
           }
+          data = this.decodeIntrospections(data);
+          this.currentModel = data.current_model;
+          this.models = data.models;
         }.bind(this);
         request.ontimeout = onLoadError;
         request.onerror = onLoadError;
@@ -288,6 +331,7 @@
         request.onprogress = function () {};
         window.setTimeout(request.send.bind(request));
       } else if (this.isObject(introspections)) {
+        introspections = this.decodeIntrospections(introspections);
         this.currentModel = introspections.current_model;
         this.models = introspections.models;
       } else {
@@ -297,6 +341,77 @@
       }
     },
 
+    decodeIntrospections: function (data) {
+      // Expands compact schema encoding, see djangoql.schema.compact_schema
+      var models = {};
+      if (data.format !== 'compact') {
+        return data;
+      }
+      data.models.forEach(function (fields, modelIndex) {
+        var model = {};
+        fields.forEach(function (compact) {
+          var field = {
+            type: data.types[compact[1]],
+            nullable: !!(compact[2] & 1),
+            options: [],
+            has_more_options: !!(compact[2] & 4)
+          };
+          compact.slice(3).forEach(function (item) {
+            var key;
+            if (typeof item === 'number') {
+              field.relation = data.labels[item];
+            } else if (Array.isArray(item)) {
+              field.options = item;
+            } else {
+              for (key in item) {
+                if (item.hasOwnProperty(key)) {
+                  field[key] = item[key];
+                }
+              }
+            }
+          });
+          model[compact[0]] = field;
+        });
+        models[data.labels[modelIndex]] = model;
+      });
+      return {
+        current_model: data.labels[data.current_model],
+        models: models
+      };
+    },
+
+    absoluteUrl: function (url) {
+      // URL constructor is missing in IE, links resolve URLs everywhere
+      var link = document.createElement('a');
+      link.href = url;
+      return link.href;
+    },
+
+    // localStorage may be disabled or full, it's used as a cache only
+    storageGet: function (key) {
+      try {
+        return window.localStorage.getItem(key);
+      } catch (e) {
+        return null;
+      }
+    },
+
+    storageSet: function (key, value) {
+      try {
+        window.localStorage.setItem(key, value);
+      } catch (e) {
+        // ignore
+      }
+    },
+
+    storageRemove: function (key) {
+      try {
+        window.localStorage.removeItem(key);
+      } catch (e) {
+        // ignore
+      }
+    },
+
     isObject: function (obj) {
       return (({}).toString.call(obj) === '[object Object]');
     },
@@ -618,6 +733,7 @@
       var resolvedName;
       var lastToken = null;
       var nextToLastToken = null;
+      var nameToken = null;  // field name before the comparison operator
       var tokens = this.lexer.setInput(text.slice(0, cursorPos)).lexAll();
       if (tokens.length && tokens[tokens.length - 1].end >= cursorPos) {
         // if cursor is positioned on the last token then remove it.
@@ -628,6 +744,12 @@
         lastToken = tokens[tokens.length - 1];
         if (tokens.length > 1) {
           nextToLastToken = tokens[tokens.length - 2];
+          nameToken = nextToLastToken;
+        }
+        if (lastToken.name === 'STARTSWITH' && nextToLastToken &&
+            nextToLastToken.name === 'NOT') {
+          // "not startswith" operator consists of two tokens
+          nameToken = tokens.length > 2 ? tokens[tokens.length - 3] : null;
         }
       }
 
@@ -674,10 +796,11 @@
           }
         }
       } else if (lastToken && whitespace &&
-          nextToLastToken && nextToLastToken.name === 'NAME' &&
-          ['EQUALS', 'NOT_EQUALS', 'CONTAINS', 'NOT_CONTAINS', 'GREATER_EQUAL',
-            'GREATER', 'LESS_EQUAL', 'LESS'].indexOf(lastToken.name) >= 0) {
-        resolvedName = this.resolveName(nextToLastToken.value);
+          nameToken && nameToken.name === 'NAME' &&
+          ['EQUALS', 'NOT_EQUALS', 'CONTAINS', 'NOT_CONTAINS', 'STARTSWITH',
+            'GREATER_EQUAL', 'GREATER', 'LESS_EQUAL', 'LESS']
+              .indexOf(lastToken.name) >= 0) {
+        resolvedName = this.resolveName(nameToken.value);
         if (resolvedName.model) {
           scope = 'value';
           model = resolvedName.model;
@@ -760,6 +883,8 @@
             if (field.type === 'str') {
               suggestions.push('~');
               suggestions.push('!~');
+              suggestions.push('startswith');
+              suggestions.push('not startswith');
               snippetAfter = ' "|"';
             } else if (field.type === 'date' || field.type === 'datetime') {
               snippetAfter = ' "|"';
@@ -808,7 +933,9 @@
               }.bind(this);
             }
             this.highlightCaseSensitive = this.valuesCaseSensitive;
-            this.suggestions = field.options.map(function (f) {
+            this.suggestions = this.getFieldOptions(
+                context.model, context.field, field
+            ).map(function (f) {
               return suggestion(f, snippetBefore, snippetAfter);
             });
           } else if (field.type === 'bool') {
@@ -844,75 +971,123 @@
         this.selected = null;
       }
     },
-    loadExtraSuggestions: function() {
-      var suggestionsURL = this.options.suggestions;
-      var self = this;
-      var urls = Object.keys(this.models).reduce(function(urls, modelKey) {
-        var model = self.models[modelKey];
-        Object.keys(model).forEach(function(fieldKey) {
-          var field = model[fieldKey];
-          if (field && field.has_more_options) {
-            var page = field.next_options_page_number;
-            urls.push({
-              url: makeURL(modelKey, fieldKey, page),
-              modelKey: modelKey,
-              fieldKey: fieldKey
-            });
-          }
-        });
-        return urls;
-      }, []);
-      console.log(urls);
 
-      function makeURL(modelKey, fieldKey, page) {
-        return suggestionsURL + modelKey + "/" + fieldKey + "/" + page;
-        k;
+    getFieldOptions: function (modelName, fieldName, field) {
+      // Options from introspections are complete unless the server has more
+      // of them. In that case the server is asked for options matching the
+      // current prefix, and loaded options are shown meanwhile. Introspections
+      // may have no options at all, then the first page is requested.
+      var key;
+      if (!field.has_more_options || !this.options.suggestions ||
+          (!this.prefix && field.options.length)) {
+        return field.options;
       }
+      key = JSON.stringify([modelName, fieldName, this.prefix]);
+      if (this.remoteOptions.hasOwnProperty(key)) {
+        return this.remoteOptions[key];
+      }
+      this.debouncedLoadRemoteOptions(modelName, fieldName, this.prefix);
+      return field.options;
+    },
 
-      function loadURL(url, onSuccess, onLoadError) {
-        var request = new XMLHttpRequest();
-        request.open("GET", url, true);
-        request.onload = function() {
-          var data;
-          if (request.status === 200) {
-            data = JSON.parse(request.responseText);
-            onSuccess(data);
-          } else {
-            onLoadError();
-          }
-        };
-        request.ontimeout = onLoadError;
-        request.onerror = onLoadError;
-        request.onprogress = function() {};
-        window.setTimeout(request.send.bind(request));
+    loadRemoteOptions: function (modelName, fieldName, prefix) {
+      var key = JSON.stringify([modelName, fieldName, prefix]);
+      var url;
+      var request;
+      var onLoadError;
+      if (this.remoteOptions.hasOwnProperty(key) || this.loadingOptions[key]) {
+        return;
+      }
+      this.loadingOptions[key] = true;
+      if (this.options.suggestionsBatch) {
+        // Requests made in the same tick are sent together
+        this.pendingOptions.push({
+          key: key,
+          model: modelName,
+          field: fieldName,
+          search: prefix
+        });
+        if (this.pendingOptions.length === 1) {
+          window.setTimeout(this.flushRemoteOptions.bind(this));
+        }
+        return;
       }
+      url = this.options.suggestions + modelName + '/' + fieldName + '/' +
+          '?search=' + encodeURIComponent(prefix);
+      onLoadError = function () {
+        delete this.loadingOptions[key];
+        this.logError('failed to load suggestions from ' + url);
+      }.bind(this);
+      request = new XMLHttpRequest();
+      request.open('GET', url, true);
+      request.onload = function () {
+        if (request.status === 200) {
+          this.setRemoteOptions(key, JSON.parse(request.responseText));
+        } else {
+          onLoadError();
+        }
+      }.bind(this);
+      request.ontimeout = onLoadError;
+      request.onerror = onLoadError;
+      request.onprogress = function () {};
+      window.setTimeout(request.send.bind(request));
+    },
 
-      function processSuggestions(modelKey, fieldKey) {
-        return function(data) {
-          var model = self.models[modelKey];
-          var field = model[fieldKey];
-          field.has_more_options = data.has_more_options;
-          var page = (field.next_options_page_number =
-            data.next_options_page_number);
-          field.options = field.options.concat(data.options);
-          if (data.has_more_options) {
-            var url = makeURL(modelKey, fieldKey, page);
-            loadURL(url, processSuggestions(modelKey, fieldKey));
-          }
-        };
+    flushRemoteOptions: function () {
+      var batch = this.pendingOptions;
+      var url = this.options.suggestionsBatch;
+      var request;
+      var onLoadError;
+      this.pendingOptions = [];
+      if (!batch.length) {
+        return;
       }
+      onLoadError = function () {
+        batch.forEach(function (item) {
+          delete this.loadingOptions[item.key];
+        }.bind(this));
+        this.logError('failed to load suggestions from ' + url);
+      }.bind(this);
+      request = new XMLHttpRequest();
+      request.open('POST', url, true);
+      request.setRequestHeader('Content-Type', 'application/json');
+      request.setRequestHeader('X-CSRFToken', this.getCookie('csrftoken'));
+      request.onload = function () {
+        var results;
+        if (request.status === 200) {
+          results = JSON.parse(request.responseText);
+          batch.forEach(function (item, i) {
+            this.setRemoteOptions(item.key, results[i]);
+          }.bind(this));
+        } else {
+          onLoadError();
+        }
+      }.bind(this);
+      request.ontimeout = onLoadError;
+      request.onerror = onLoadError;
+      request.send(JSON.stringify(batch.map(function (item) {
+        return { model: item.model, field: item.field, search: item.search };
+      })));
+    },
 
-      urls.forEach(function(item) {
-        loadURL(
-          item.url,
-          processSuggestions(item.modelKey, item.fieldKey),
-          function() {
-            console.error("Error loading extra suggestions from ", item.url);
-          }
-        );
-      });
+    setRemoteOptions: function (key, response) {
+      delete this.loadingOptions[key];
+      if (!response || response.error) {
+        this.logError('failed to load suggestions: ' +
+            (response && response.error));
+        return;
+      }
+      this.remoteOptions[key] = response.options;
+      if (document.activeElement === this.textarea) {
+        this.popupCompletion();
+      }
     },
 
+    getCookie: function (name) {
+      var match = document.cookie.match(
+          new RegExp('(?:^|;\\s*)' + name + '=([^;]*)'));
+      return match ? decodeURIComponent(match[1]) : '';
+    }
   };
 
   return DjangoQL;
@@ -94,8 +94,9 @@
 
     djangoQL = new DjangoQL({
       completionEnabled: QLEnabled,
-      introspections: 'introspect/',
+      introspections: 'introspect/?format=compact',
       suggestions: 'suggestions/',
+      suggestionsBatch: 'suggestions/batch/',
       syntaxHelp: 'djangoql-syntax/',
       selector: 'textarea[name=q]',
       autoResize: true
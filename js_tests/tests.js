@@ -162,6 +162,31 @@ describe('DjangoQL completion', function () {
       });
     });
 
+    it('should lex "startswith" as an operator only after a name', function () {
+      var examples = [
+        {
+          input: 'startswith startswith "x"',
+          names: ['NAME', 'STARTSWITH', 'STRING_VALUE']
+        },
+        {
+          input: 'a not startswith "x"',
+          names: ['NAME', 'NOT', 'STARTSWITH', 'STRING_VALUE']
+        },
+        {
+          input: 'startswith.startswith = 1',
+          names: ['NAME', 'EQUALS', 'INT_VALUE']
+        },
+        {
+          input: 'a = 1 and startswith',
+          names: ['NAME', 'EQUALS', 'INT_VALUE', 'AND', 'NAME']
+        }
+      ];
+      examples.forEach(function (e) {
+        var tokens = djangoQL.lexer.setInput(e.input).lexAll();
+        expect(tokens.map(function (t) { return t.name; })).to.eql(e.names);
+      });
+    });
+
     it('should recognize strings', function () {
       var strings = ['""', '"42"', '"\\t\\n\\u0042 \\" ^"'];
       djangoQL.lexer.setInput(strings.join(' '));
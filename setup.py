@@ -8,7 +8,16 @@ except ImportError:
     from distutils.core import setup
 
 
-packages = ['djangoql']
+packages = [
+    'djangoql',
+    'djangoql.contrib',
+    'djangoql.contrib.suggestions',
+    'djangoql.contrib.suggestions.management',
+    'djangoql.contrib.suggestions.management.commands',
+    'djangoql.contrib.suggestions.migrations',
+    'djangoql.management',
+    'djangoql.management.commands',
+]
 requires = ['ply>=3.8']
 
 setup(
@@ -0,0 +1,36 @@
+"""
+Micro-benchmarks for DjangoQL internals.
+
+Run them from the test_project directory, for example:
+
+    $ python -m benchmarks.parser_pool
+"""
+import os
+import sys
+import timeit
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_project.settings')
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+        __file__
+    ))))
+    import django
+    django.setup()
+
+
+def measure(func, number=None, repeat=5):
+    """
+    Returns the best time per call of func in seconds
+    """
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def report(title, seconds):
+    if seconds >= 1e-3:
+        print('%-50s %10.3f ms' % (title, seconds * 1e3))
+    else:
+        print('%-50s %10.3f us' % (title, seconds * 1e6))
@@ -0,0 +1,30 @@
+"""
+Memory used by parsed ASTs and speed of comparing them.
+"""
+import tracemalloc
+
+from benchmarks import measure, report, setup_django
+
+
+def main():
+    setup_django()
+    from djangoql.parser import DjangoQLParser
+
+    parser = DjangoQLParser()
+    query = ' or '.join(
+        '(author.name = "user %s" and id in (%s, %s, %s))' % (i, i, i + 1, i + 2)
+        for i in range(500)
+    )
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ast = parser.parse(query)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print('%-50s %10.1f KiB' % ('AST of 500 or-ed terms', used / 1024.0))
+    other = parser.parse(query)
+    report('compare equal ASTs', measure(lambda: ast == other))
+    report('hash AST', measure(lambda: hash(ast)))
+
+
+if __name__ == '__main__':
+    main()
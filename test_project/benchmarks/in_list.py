@@ -0,0 +1,38 @@
+"""
+Parsing and running "in" lists of different length with each large list
+strategy on SQLite.
+"""
+from benchmarks import measure, report, setup_django
+
+
+def main():
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    from djangoql.parser import DjangoQLParser
+    from djangoql.queryset import apply_search
+
+    connection.creation.create_test_db(verbosity=0)
+    User.objects.bulk_create(
+        User(username='user%s' % i) for i in range(10000)
+    )
+    parser = DjangoQLParser()
+    for count in (10, 1000, 50000):
+        search = 'id in (%s)' % ', '.join(str(i) for i in range(count))
+        print('%s items' % count)
+        report('  parse', measure(lambda: parser.parse(search), repeat=3))
+        for strategy in (None, 'chunked', 'array'):
+            with override_settings(DJANGOQL_IN_LIST_STRATEGY=strategy):
+                def run():
+                    return apply_search(User.objects.all(), search).count()
+                title = '  query, %s strategy' % (strategy or 'default')
+                try:
+                    report(title, measure(run, repeat=3))
+                except Exception as e:
+                    print('%-50s %s' % (title, e))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""
+Cost of schema introspection per request: eager and lazy introspection
+without cache, and with the shared introspection cache.
+"""
+from benchmarks import measure, report, setup_django
+
+
+def main():
+    setup_django()
+    from django.contrib.auth.models import User
+
+    from djangoql.parser import DjangoQLParser
+    from djangoql.schema import DjangoQLSchema
+
+    class EagerSchema(DjangoQLSchema):
+        cache_introspection = False
+        lazy_introspection = False
+
+    class LazySchema(DjangoQLSchema):
+        cache_introspection = False
+
+    ast = DjangoQLParser().parse('username = "foo"')
+    for schema in (EagerSchema, LazySchema, DjangoQLSchema):
+        report(
+            '%s(User).validate()' % schema.__name__,
+            measure(lambda: schema(User).validate(ast)),
+        )
+        report(
+            '%s(User).as_dict()' % schema.__name__,
+            measure(lambda: schema(User).as_dict()),
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Size of introspection payload in JSON and compact encodings, on a synthetic
+schema of 500 models with 20 fields each, some of them relations.
+"""
+import gzip
+import json
+import random
+from collections import OrderedDict
+
+from benchmarks import measure, report, setup_django
+
+
+MODELS = 500
+FIELDS = 20
+TYPES = ('int', 'str', 'float', 'bool', 'date', 'datetime')
+
+
+def synthetic_schema():
+    rnd = random.Random(42)
+    labels = ['app%s.model%s' % (i % 20, i) for i in range(MODELS)]
+    models = OrderedDict()
+    for label in labels:
+        fields = OrderedDict()
+        for i in range(FIELDS):
+            field = {
+                'nullable': rnd.random() < 0.3,
+                'has_next': False,
+                'next_page_number': None,
+                'options': [],
+            }
+            if i % 5 == 4:
+                field['type'] = 'relation'
+                field['relation'] = rnd.choice(labels)
+                fields['related_%s' % i] = field
+                continue
+            field['type'] = rnd.choice(TYPES)
+            if field['type'] == 'str' and rnd.random() < 0.2:
+                del field['has_next'], field['next_page_number']
+                field['has_more_options'] = True
+                field['next_options_page_number'] = 1
+            fields['field_%s' % i] = field
+        models[label] = fields
+    return {'current_model': labels[0], 'models': models}
+
+
+def size(data):
+    content = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return len(content), len(gzip.compress(content))
+
+
+def main():
+    setup_django()
+    from djangoql.schema import compact_schema
+
+    schema = synthetic_schema()
+    compact = compact_schema(schema)
+    for title, data in (('json', schema), ('compact', compact)):
+        raw, gzipped = size(data)
+        print('%-50s %10d bytes, %d gzipped' % (title, raw, gzipped))
+    report('compact_schema()', measure(lambda: compact_schema(schema)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+Tokenizing and unescaping speed on multi-kilobyte generated queries.
+"""
+from benchmarks import measure, report
+
+from djangoql.lexer import DjangoQLLexer
+from djangoql.parser import unescape
+
+
+def main():
+    lexer = DjangoQLLexer()
+    queries = (
+        ('in list with 5000 ints', 'id in (%s)' % ', '.join(
+            str(i) for i in range(5000)
+        )),
+        ('in list with 5000 strings', 'name in (%s)' % ', '.join(
+            '"name %s"' % i for i in range(5000)
+        )),
+        ('500 multi-line comparisons', '\n or '.join(
+            'author.username = "user%s"' % i for i in range(500)
+        )),
+    )
+    for title, query in queries:
+        report(
+            '%s, %s chars' % (title, len(query)),
+            measure(lambda: list(lexer.input(query))),
+        )
+    report('unescape, plain string', measure(lambda: unescape('name 42')))
+    report('unescape, escaped string', measure(lambda: unescape(r'\"42\"')))
+
+
+if __name__ == '__main__':
+    main()
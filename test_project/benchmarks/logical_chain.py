@@ -0,0 +1,30 @@
+"""
+Parse, validate and build Q object for long generated OR chains.
+"""
+from benchmarks import measure, report, setup_django
+
+
+def main():
+    setup_django()
+    from djangoql.parser import DjangoQLParser
+    from djangoql.queryset import build_filter
+    from djangoql.schema import DjangoQLSchema
+
+    from core.models import Book
+
+    schema = DjangoQLSchema(Book)
+    parser = DjangoQLParser()
+    for count in (100, 1000, 5000):
+        query = ' or '.join('id = %s' % i for i in range(count))
+        ast = parser.parse(query)
+        print('%s or-ed comparisons' % count)
+        report('  parse', measure(lambda: parser.parse(query), repeat=3))
+        report('  validate', measure(lambda: schema.validate(ast), repeat=3))
+        report('  build_filter', measure(
+            lambda: build_filter(ast, schema),
+            repeat=3,
+        ))
+
+
+if __name__ == '__main__':
+    main()
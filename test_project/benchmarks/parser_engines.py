@@ -0,0 +1,32 @@
+"""
+Throughput of PLY and descent parser engines on long queries.
+"""
+from benchmarks import measure, report, setup_django
+
+
+def main():
+    setup_django()
+    from djangoql.parser import DjangoQLParser
+
+    queries = (
+        ('short query', 'name = "foo" and (rating > 3.5 or genre = 2)'),
+        ('200 or-ed comparisons', ' or '.join(
+            'id = %s' % i for i in range(200)
+        )),
+        ('in list with 5000 items', 'id in (%s)' % ', '.join(
+            str(i) for i in range(5000)
+        )),
+        ('50 nested parenthesis', '(' * 50 + 'a = 1' + ')' * 50),
+    )
+    engines = (
+        ('ply', DjangoQLParser()),
+        ('descent', DjangoQLParser(engine='descent')),
+    )
+    for title, query in queries:
+        print('%s, %s chars' % (title, len(query)))
+        for engine, parser in engines:
+            report('  %s' % engine, measure(lambda: parser.parse(query)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""
+Compares building a new parser for every search vs. re-using a thread-local
+parser from djangoql.parser.get_parser().
+"""
+from benchmarks import measure, report
+
+from djangoql.parser import DjangoQLParser, get_parser
+
+
+QUERIES = (
+    'name = "foo"',
+    'author.username ~ "bar" and (rating > 3.5 or genre in (1, 2, 3))',
+)
+
+
+def main():
+    for query in QUERIES:
+        print(query)
+        fresh = measure(lambda: DjangoQLParser().parse(query))
+        pooled = measure(lambda: get_parser().parse(query))
+        report('  new parser per call', fresh)
+        report('  thread-local parser', pooled)
+        report('  saving per call', fresh - pooled)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Parsing of timestamps in search queries: datetime.strptime() vs
+djangoql.schema.parse_period(), which is memoized.
+"""
+from datetime import datetime
+
+from benchmarks import measure, report, setup_django
+
+
+VALUE = '2017-01-30 12:30:15'
+
+
+def main():
+    setup_django()
+    from djangoql.parser import DjangoQLParser
+    from djangoql.queryset import build_filter
+    from djangoql.schema import DjangoQLSchema, parse_period, parsed_periods
+
+    from core.models import Book
+
+    def uncached():
+        parsed_periods.clear()
+        parse_period(VALUE)
+
+    report('strptime()', measure(
+        lambda: datetime.strptime(VALUE, '%Y-%m-%d %H:%M:%S'),
+    ))
+    report('parse_period(), not memoized', measure(uncached))
+    report('parse_period(), memoized', measure(lambda: parse_period(VALUE)))
+
+    schema = DjangoQLSchema(Book)
+    ast = DjangoQLParser().parse(' or '.join(
+        'written = "2017-01-%02d"' % (i % 28 + 1) for i in range(100)
+    ))
+
+    def compile_query():
+        schema.validate(ast)
+        build_filter(ast, schema)
+
+    report('validate and build 100 dates', measure(compile_query))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Deep pages of suggestion options: page numbers (OFFSET) vs cursors (keyset)
+on SQLite.
+"""
+from benchmarks import measure, report, setup_django
+
+
+def main():
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    from djangoql.schema import StrField, encode_cursor
+
+    connection.creation.create_test_db(verbosity=0)
+    User.objects.bulk_create(
+        User(username='user%06d' % i) for i in range(100000)
+    )
+    field = StrField(model=User, name='username', suggest_options=True)
+    for page in (1, 100, 3000):
+        offset = (page - 1) * field.suggest_options_page_size
+        after = User.objects.order_by('username')\
+            .values_list('username', flat=True)[offset - 1] if offset else None
+        cursor = encode_cursor({'after': after}) if after else None
+        print('page %s' % page)
+        report('  page number', measure(
+            lambda: field.get_paginated_options(page),
+            repeat=3,
+        ))
+        report('  cursor', measure(
+            lambda: field.get_options_page(cursor=cursor),
+            repeat=3,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Top-level "or" across relations: a single WHERE with joins vs UNION of
+subqueries (DjangoQLSchema.union_disjunctions) on SQLite.
+
+UNION wins by far when every branch is selective and can use its own index.
+The gain shrinks when a branch has to scan the table anyway, and is gone
+when a branch matches a large part of the table.
+"""
+import random
+
+from benchmarks import measure, report, setup_django
+
+
+USERS = 5000
+BOOKS = 100000
+SEARCHES = (
+    ('indexed branches',
+     'author.username = "user00042" or id = 1234'),
+    ('indexed branches, many-to-many',
+     'author.username = "user00042" or similar_books.id = 1234 or id = 77'),
+    ('one branch scans the table',
+     'author.username = "user00042" or name = "book001234"'),
+    ('one branch matches half of the rows',
+     'author.username = "user00042" or is_published = True'),
+)
+
+
+def main():
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    from djangoql.queryset import apply_search
+    from djangoql.schema import DjangoQLSchema
+
+    from core.models import Book
+
+    class UnionSchema(DjangoQLSchema):
+        union_disjunctions = True
+
+    connection.creation.create_test_db(verbosity=0)
+    rnd = random.Random(42)
+    User.objects.bulk_create(
+        User(username='user%05d' % i) for i in range(USERS)
+    )
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    Book.objects.bulk_create(
+        Book(
+            name='book%06d' % i,
+            author_id=rnd.choice(user_ids),
+            is_published=rnd.random() < 0.5,
+        )
+        for i in range(BOOKS)
+    )
+    pairs = set(
+        (rnd.randint(1, BOOKS), rnd.randint(1, BOOKS))
+        for _ in range(BOOKS // 10)
+    )
+    through = Book.similar_books.through
+    through.objects.bulk_create(
+        through(from_book_id=from_id, to_book_id=to_id)
+        for from_id, to_id in pairs
+    )
+
+    for title, search in SEARCHES:
+        print('%s: %s' % (title, search))
+        for mode, schema in (('where', DjangoQLSchema),
+                             ('union', UnionSchema)):
+            qs = apply_search(Book.objects.all(), search, schema)
+            report('  %s' % mode, measure(
+                lambda: list(qs.values_list('pk', flat=True)),
+                repeat=3,
+            ))
+
+
+if __name__ == '__main__':
+    main()
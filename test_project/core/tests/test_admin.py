@@ -1,5 +1,6 @@
 import json
 
+from django.contrib.admin import site
 from django.contrib.auth.models import User
 from django.test import TestCase
 try:
@@ -7,6 +8,16 @@ try:
 except ImportError:  # Django 2.0
     from django.urls import reverse
 
+from djangoql.cache import introspection_cache
+from djangoql.schema import DjangoQLSchema
+
+from ..models import Book
+
+
+class UncachedSchema(DjangoQLSchema):
+    def get_introspection_cache_key(self):
+        return None
+
 
 class DjangoQLAdminTest(TestCase):
     def setUp(self):
@@ -36,3 +47,104 @@ class DjangoQLAdminTest(TestCase):
         # authorized request should be served
         response = self.client.get(url)
         self.assertEqual(200, response.status_code)
+
+    def test_introspection_etag(self):
+        url = reverse('admin:core_book_djangoql_introspect')
+        self.assertTrue(self.client.login(**self.credentials))
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        etag = response['ETag']
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotIn(b'\n', response.content)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertEqual(etag, response['ETag'])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"foo"')
+        self.assertEqual(200, response.status_code)
+        # ETags made weak by GZipMiddleware, lists and wildcard
+        for if_none_match in ('W/' + etag, '"foo", W/' + etag, '*'):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=if_none_match)
+            self.assertEqual(304, response.status_code, if_none_match)
+            self.assertIn('private', response['Cache-Control'])
+
+    def test_compact_introspection(self):
+        url = reverse('admin:core_book_djangoql_introspect')
+        self.assertTrue(self.client.login(**self.credentials))
+        response = self.client.get(url, {'format': 'compact'})
+        self.assertEqual(200, response.status_code)
+        introspections = json.loads(response.content.decode('utf8'))
+        self.assertEqual('compact', introspections['format'])
+        self.assertNotEqual(
+            response['ETag'],
+            self.client.get(url)['ETag'],
+        )
+        response = self.client.get(url, {'format': 'foo'})
+        self.assertEqual(400, response.status_code)
+
+    def test_introspection_without_options(self):
+        url = reverse('admin:core_book_djangoql_introspect')
+        model_admin = site._registry[Book]
+        model_admin.djangoql_inline_options = False
+        model_admin.djangoql_introspection_max_age = 3600
+        self.assertTrue(self.client.login(**self.credentials))
+        try:
+            response = self.client.get(url)
+            self.assertEqual(200, response.status_code)
+            self.assertIn('max-age=3600', response['Cache-Control'])
+            introspections = json.loads(response.content.decode('utf8'))
+            name = introspections['models']['core.book']['name']
+            self.assertListEqual([], name['options'])
+            self.assertTrue(name['has_more_options'])
+            # Serialized schema is cached, only the session is loaded
+            with self.assertNumQueries(2):
+                response = self.client.get(
+                    url,
+                    HTTP_IF_NONE_MATCH=response['ETag'],
+                )
+            self.assertEqual(304, response.status_code)
+        finally:
+            del model_admin.djangoql_inline_options
+            del model_admin.djangoql_introspection_max_age
+            introspection_cache.clear()
+
+    def test_introspection_without_cache_key(self):
+        model_admins = [site._registry[Book], site._registry[User]]
+        for model_admin in model_admins:
+            model_admin.djangoql_schema = UncachedSchema
+            model_admin.djangoql_inline_options = False
+        self.assertTrue(self.client.login(**self.credentials))
+        try:
+            for model_admin, label in zip(model_admins,
+                                          ('core.book', 'auth.user')):
+                url = reverse('admin:%s_%s_djangoql_introspect' % (
+                    model_admin.model._meta.app_label,
+                    model_admin.model._meta.model_name,
+                ))
+                response = self.client.get(url)
+                introspections = json.loads(response.content.decode('utf8'))
+                self.assertEqual(label, introspections['current_model'])
+        finally:
+            for model_admin in model_admins:
+                del model_admin.djangoql_schema
+                del model_admin.djangoql_inline_options
+            introspection_cache.clear()
+
+    def test_introspection_toggle_options(self):
+        url = reverse('admin:core_book_djangoql_introspect')
+        model_admin = site._registry[Book]
+        self.assertTrue(self.client.login(**self.credentials))
+        try:
+            model_admin.djangoql_inline_options = False
+            response = self.client.get(url)
+            name = json.loads(response.content.decode('utf8'))\
+                ['models']['core.book']['name']
+            self.assertTrue(name['has_more_options'])
+            model_admin.djangoql_inline_options = True
+            response = self.client.get(url)
+            name = json.loads(response.content.decode('utf8'))\
+                ['models']['core.book']['name']
+            self.assertFalse(name['has_more_options'])
+        finally:
+            del model_admin.djangoql_inline_options
+            introspection_cache.clear()
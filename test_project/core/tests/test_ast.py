@@ -1,9 +1,15 @@
+import pickle
 from unittest import TestCase
 
-from djangoql.ast import Expression, Name, Comparison, Const
+from djangoql.ast import (
+    Comparison, Const, Expression, List, Logical, LogicalExpression, Name,
+)
+from djangoql.parser import DjangoQLParser
 
 
 class DjangoQLASTTest(TestCase):
+    parser = DjangoQLParser()
+
     def test_equality(self):
         self.assertEqual(
             Expression(Name('age'), Comparison('='), Const(18)),
@@ -13,3 +19,43 @@ class DjangoQLASTTest(TestCase):
             Expression(Name('age'), Comparison('='), Const(42)),
             Expression(Name('age'), Comparison('='), Const(18)),
         )
+
+    def test_immutable(self):
+        node = Expression(Name('a'), Comparison('='), Const(1))
+        self.assertRaises(AttributeError, setattr, node, 'left', Name('b'))
+        self.assertRaises(AttributeError, setattr, node, 'foo', 1)
+        self.assertRaises(AttributeError, delattr, node, 'right')
+        self.assertFalse(hasattr(node, '__dict__'))
+
+    def test_hash(self):
+        query = '(a = 1 or b.c in ("x", "y")) and d != None'
+        ast = self.parser.parse(query)
+        same = self.parser.parse(query)
+        self.assertIsNot(ast, same)
+        self.assertEqual(ast, same)
+        self.assertEqual(hash(ast), hash(same))
+        self.assertEqual({ast: 1}, {same: 1})
+        self.assertNotEqual(ast, self.parser.parse(query.replace('1', '2')))
+
+    def test_const_equality(self):
+        self.assertEqual(Const(1), Const(1))
+        self.assertNotEqual(Const(1), Const(True))
+        self.assertNotEqual(Const(0), Const(False))
+        self.assertNotEqual(Const('a'), Name('a'))
+        self.assertNotEqual(Logical('and'), Comparison('and'))
+
+    def test_values(self):
+        name = Name(['a', 'b'])
+        self.assertEqual(('a', 'b'), name.parts)
+        self.assertEqual('a.b', name.value)
+        self.assertEqual(Name('a'), Name(['a']))
+        items = List([Const(1), Const('a')])
+        self.assertEqual((1, 'a'), items.value)
+        self.assertIs(items.value, items.value)
+
+    def test_pickle(self):
+        ast = self.parser.parse('a = 1 and b in (1, 2) and c.d ~ "x"')
+        self.assertIsInstance(ast, LogicalExpression)
+        restored = pickle.loads(pickle.dumps(ast, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(ast, restored)
+        self.assertEqual(hash(ast), hash(restored))
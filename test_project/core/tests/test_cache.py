@@ -0,0 +1,197 @@
+import threading
+import time
+
+from django.contrib.auth.models import Group, User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from djangoql.cache import (
+    LRUCache, ast_cache, clear_introspection_cache, get_options_cache,
+    get_options_version, invalidate_ast_cache,
+)
+from djangoql.queryset import apply_search
+from djangoql.schema import DjangoQLSchema, StrField
+
+from ..models import Book
+
+
+class LRUCacheTest(TestCase):
+    def test_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        cache.set('c', 3)  # 'b' is the least recently used one
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+        self.assertEqual(
+            {'hits': 3, 'misses': 1, 'evictions': 1, 'size': 2, 'maxsize': 2},
+            cache.stats(),
+        )
+        cache.resize(1)
+        self.assertEqual(1, len(cache))
+        self.assertIn('c', cache)
+
+    def test_invalidate(self):
+        cache = LRUCache()
+        for key in ('a1', 'a2', 'b1'):
+            cache.set(key, key)
+        cache.invalidate(lambda key: key.startswith('a'))
+        self.assertEqual(1, len(cache))
+        cache.clear()
+        self.assertEqual(0, len(cache))
+
+
+class BookSchema(DjangoQLSchema):
+    pass
+
+
+@override_settings(DJANGOQL_AST_CACHE_SIZE=10)
+class ASTCacheTest(TestCase):
+    def setUp(self):
+        invalidate_ast_cache()
+
+    def test_cached_search(self):
+        search = 'name = "foo" and author.username ~ "bar"'
+        qs1 = apply_search(Book.objects.all(), search)
+        qs2 = apply_search(Book.objects.all(), search)
+        self.assertEqual(str(qs1.query), str(qs2.query))
+        stats = ast_cache.stats()
+        self.assertEqual(1, stats['misses'])
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(1, stats['size'])
+
+    def test_keys(self):
+        apply_search(Book.objects.all(), 'id = 1')
+        apply_search(Book.objects.all(), 'id = 1', schema=BookSchema)
+        apply_search(User.objects.all(), 'id = 1')
+        self.assertEqual(3, len(ast_cache))
+        invalidate_ast_cache(schema=BookSchema)
+        self.assertEqual(2, len(ast_cache))
+        invalidate_ast_cache(model=User)
+        self.assertEqual(1, len(ast_cache))
+
+    @override_settings(DJANGOQL_AST_CACHE_SIZE=0)
+    def test_disabled(self):
+        apply_search(Book.objects.all(), 'id = 1')
+        self.assertEqual(0, len(ast_cache))
+
+    def test_cleared_with_introspection_cache(self):
+        apply_search(Book.objects.all(), 'id = 1')
+        self.assertEqual(1, len(ast_cache))
+        with override_settings(DJANGOQL_PARSER_ENGINE='descent'):
+            self.assertEqual(0, len(ast_cache))
+        apply_search(Book.objects.all(), 'id = 1')
+        clear_introspection_cache()
+        self.assertEqual(0, len(ast_cache))
+
+
+class CachedBookNameField(StrField):
+    model = Book
+    name = 'name'
+    suggest_options = True
+    suggest_options_cache_timeout = 60
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+})
+class OptionsCacheTest(TestCase):
+    def setUp(self):
+        get_options_cache().clear()
+        self.author = User.objects.create(username='author')
+        self.book = Book.objects.create(name='foo', author=self.author)
+
+    def test_cached_options(self):
+        field = CachedBookNameField()
+        with self.assertNumQueries(1):
+            self.assertEqual(['foo'], field.get_paginated_options()['options'])
+            self.assertEqual(['foo'], field.get_paginated_options()['options'])
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                ['foo'],
+                field.get_options_page(search='f')['options'],
+            )
+            self.assertEqual(
+                ['foo'],
+                field.get_options_page(search='f')['options'],
+            )
+        with self.assertNumQueries(1):
+            self.assertEqual([], field.get_options_page(search='x')['options'])
+
+    def test_invalidation(self):
+        field = CachedBookNameField()
+        field.get_paginated_options()
+        Book.objects.create(name='bar', author=self.author)
+        self.assertEqual(
+            ['bar', 'foo'],
+            field.get_paginated_options()['options'],
+        )
+        self.book.delete()
+        self.assertEqual(['bar'], field.get_paginated_options()['options'])
+        # Changes of other models don't invalidate book options
+        with self.assertNumQueries(1):
+            User.objects.create(username='reader')
+            field.get_paginated_options()
+
+    def test_m2m_invalidation(self):
+        field = CachedBookNameField()
+        field.get_paginated_options()
+        self.book.similar_books.add(self.book)
+        with self.assertNumQueries(1):
+            field.get_paginated_options()
+
+    def test_watched_on_introspection(self):
+        class CachedGroupNameField(StrField):
+            suggest_options_cache_timeout = 60
+
+        class GroupSchema(DjangoQLSchema):
+            def get_fields(self, model):
+                if model is Group:
+                    return [CachedGroupNameField(model=Group, name='name')]
+                return super(GroupSchema, self).get_fields(model)
+
+        self.assertIn('auth.group', GroupSchema(Group).models)
+        # Options were never read in this process, yet writes invalidate them
+        version = get_options_version(Group)
+        Group.objects.create(name='readers')
+        self.assertNotEqual(version, get_options_version(Group))
+
+    def test_disabled(self):
+        field = CachedBookNameField()
+        field.suggest_options_cache_timeout = None
+        with self.assertNumQueries(2):
+            field.get_paginated_options()
+            field.get_paginated_options()
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+})
+class OptionsCacheSingleFlightTest(SimpleTestCase):
+    def test_single_flight(self):
+        get_options_cache().clear()
+        calls = []
+
+        class SlowField(CachedBookNameField):
+            def get_options(self):
+                calls.append(1)
+                time.sleep(0.1)
+                return ['foo', 'bar']
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    SlowField().get_paginated_options(),
+                ),
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(calls))
+        self.assertEqual(5, len(results))
+
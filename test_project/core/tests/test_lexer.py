@@ -23,6 +23,10 @@ class DjangoQLLexerTest(TestCase):
             self.assertEqual(token.type, expected[i][0])
             self.assertEqual(token.value, expected[i][1])
 
+    def test_ply_options(self):
+        lexer = DjangoQLLexer(debug=True, optimize=False)
+        self.assert_output(lexer.input('a'), [('NAME', 'a')])
+
     def test_punctuator(self):
         self.assert_output(self.lexer.input('('), [('PAREN_L', '(')])
         self.assert_output(self.lexer.input(')'), [('PAREN_R', ')')])
@@ -54,12 +58,19 @@ class DjangoQLLexerTest(TestCase):
             pass
 
     def test_reserved_words(self):
-        reserved = ('True', 'False', 'None', 'or', 'and', 'in')
+        reserved = ('True', 'False', 'None', 'or', 'and', 'in', 'startswith')
         for word in reserved:
             self.assert_output(self.lexer.input(word), [(word.upper(), word)])
         # A word made of reserved words should be treated as a name
-        for word in ('True_story', 'not_None', 'inspect'):
+        for word in ('True_story', 'not_None', 'inspect', 'a.or',
+                     'startswith_x', 'startswith.x'):
             self.assert_output(self.lexer.input(word), [('NAME', word)])
+        # Reserved word followed by a dot is not a name
+        try:
+            list(self.lexer.input('or.a'))
+            self.fail('Reserved word followed by a dot must raise an error')
+        except DjangoQLLexerError as e:
+            self.assertEqual(3, e.column)
 
     def test_int(self):
         for val in ('0', '-0', '42', '-42'):
@@ -93,3 +104,17 @@ class DjangoQLLexerTest(TestCase):
         for i, t in enumerate(self.lexer.input('1\n  3\n    5\n')):
             self.assertEqual(i + 1, t.lineno)
             self.assertEqual(i * 2 + 1, self.lexer.find_column(t))
+
+    def test_error_position(self):
+        try:
+            list(self.lexer.input('a = 1\r\nand b = "x" ^ "y"'))
+            self.fail('Illegal char exception not raised')
+        except DjangoQLLexerError as e:
+            self.assertEqual(3, e.line)  # \r\n counts as two line breaks
+            self.assertEqual(13, e.column)
+            self.assertEqual('^ "y"', e.value)
+
+    def test_find_column_previous_line(self):
+        tokens = list(self.lexer.input('a\n  b'))
+        self.assertEqual(1, self.lexer.find_column(tokens[0]))
+        self.assertEqual(3, self.lexer.find_column(tokens[1]))
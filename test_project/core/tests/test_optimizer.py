@@ -0,0 +1,158 @@
+import random
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from djangoql.ast import Const
+from djangoql.optimizer import optimize
+from djangoql.parser import DjangoQLParser
+from djangoql.queryset import apply_search, build_filter
+from djangoql.schema import DjangoQLSchema
+
+from ..models import Book
+
+
+class OptimizedSchema(DjangoQLSchema):
+    optimize_queries = True
+
+
+class DjangoQLOptimizerTest(TestCase):
+    def optimize(self, query):
+        schema = DjangoQLSchema(Book)
+        ast = DjangoQLParser().parse(query)
+        schema.validate(ast)
+        return optimize(ast, schema)
+
+    def assertOptimized(self, expected, query):
+        if isinstance(expected, bool):
+            expected = Const(expected)
+        else:
+            expected = DjangoQLParser().parse(expected)
+        self.assertEqual(expected, self.optimize(query))
+
+    def test_in_lists(self):
+        self.assertOptimized(
+            'name in ("a", "b")',
+            'name = "a" or name = "b" or name = "a"',
+        )
+        self.assertOptimized(
+            'id not in (1, 2, 3) and name = "x"',
+            'id != 1 and name = "x" and id not in (2, 3)',
+        )
+        self.assertOptimized(
+            'rating = None or rating in (1, 2)',
+            'rating = None or rating = 1 or rating = 2',
+        )
+        # Fields with custom lookups are left as is
+        self.assertOptimized(
+            'written = "2017-01-01" or written = "2017-01-02"',
+            'written = "2017-01-01" or written = "2017-01-02"',
+        )
+
+    def test_ranges(self):
+        self.assertOptimized('id > 10', 'id > 5 and id > 10')
+        self.assertOptimized('id >= 5', 'id > 5 or id >= 5 or id > 10')
+        self.assertOptimized('id = 3', 'id >= 3 and id <= 3')
+        self.assertOptimized('id = 4', 'id > 3 and id = 4 and id < 10')
+        self.assertOptimized(False, 'id > 10 and id < 5')
+        self.assertOptimized(False, 'id > 5 and id <= 5')
+        self.assertOptimized(False, 'id = 1 and id = 2')
+        self.assertOptimized(False, 'rating = None and rating > 1')
+
+    def test_constants(self):
+        self.assertOptimized(True, 'rating = None or rating != None')
+        self.assertOptimized(True, 'id = 1 or id != 1 or name = "x"')
+        self.assertOptimized(False, 'id = 1 and id != 1')
+        self.assertOptimized('id = 1', 'id = 1 or (id > 3 and id < 2)')
+        self.assertOptimized(
+            'name = "x"',
+            'name = "x" and (rating = None or rating != None)',
+        )
+        # Negated lookups of multi-valued relations use subqueries
+        self.assertOptimized(
+            'similar_books.id != 1 or similar_books.id = 1',
+            'similar_books.id != 1 or similar_books.id = 1',
+        )
+        self.assertEqual(
+            0,
+            apply_search(Book.objects.all(), 'id > 1 and id < 0',
+                         OptimizedSchema).count(),
+        )
+        self.assertEqual(
+            Book.objects.count(),
+            Book.objects.filter(build_filter(Const(True), None)).count(),
+        )
+
+    def test_equivalence(self):
+        rnd = random.Random(20191009)
+        authors = [
+            User.objects.create(username='author%s' % i) for i in range(3)
+        ]
+        for i in range(30):
+            Book.objects.create(
+                name=rnd.choice('abc'),
+                author=rnd.choice(authors),
+                genre=rnd.choice([None, 1, 2, 3]),
+                is_published=rnd.random() < 0.5,
+                rating=rnd.choice([None, 1, 2, 3, 4]),
+                price=rnd.choice([None, Decimal('1.5'), Decimal('2')]),
+            )
+        books = list(Book.objects.all())
+        for book in books:
+            book.similar_books.add(*rnd.sample(books, rnd.randint(0, 3)))
+
+        ids = [book.pk for book in books[::3]] + [books[-1].pk + 1]
+        fields = [
+            ('id', ids),
+            ('rating', [None, 1, 2, 3, 4, 5]),
+            ('price', [None, '1.5', 2, 3]),
+            ('genre', [None, 1, 2, 3]),
+            ('is_published', ['True', 'False']),
+            ('name', ['"a"', '"b"', '"c"']),
+            ('author.id', [a.pk for a in authors]),
+            ('similar_books.id', ids),
+            ('similar_books.rating', [None, 1, 2, 3]),
+        ]
+
+        def comparison():
+            name, values = rnd.choice(fields)
+            value = rnd.choice(values)
+            if value is None:
+                return '%s %s None' % (name, rnd.choice(['=', '!=']))
+            if name in ('is_published', 'name'):
+                operators = ['=', '!=']
+            else:
+                operators = ['=', '!=', '>', '>=', '<', '<=', 'in', 'not in']
+            operator = rnd.choice(operators)
+            if operator.endswith('in'):
+                items = [v for v in values if v is not None]
+                value = '(%s)' % ', '.join(
+                    str(v) for v in rnd.sample(items, rnd.randint(1, 3))
+                )
+            return '%s %s %s' % (name, operator, value)
+
+        def expression(depth):
+            if depth == 0 or rnd.random() < 0.3:
+                return comparison()
+            operator = rnd.choice([' and ', ' or '])
+            return operator.join(
+                '(%s)' % expression(depth - 1)
+                for _ in range(rnd.randint(2, 4))
+            )
+
+        rewritten = 0
+        for _ in range(300):
+            query = expression(3)
+            if self.optimize(query) != DjangoQLParser().parse(query):
+                rewritten += 1
+            expected = set(
+                apply_search(Book.objects.all(), query)
+                .values_list('pk', flat=True)
+            )
+            optimized = set(
+                apply_search(Book.objects.all(), query, OptimizedSchema)
+                .values_list('pk', flat=True)
+            )
+            self.assertSetEqual(expected, optimized, query)
+        self.assertGreater(rewritten, 50)
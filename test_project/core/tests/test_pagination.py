@@ -1,18 +1,21 @@
 import json
+from collections import Counter
 
 from django.apps import apps
+from django.contrib.admin import site
 from django.contrib.auth.models import Group, User
 from django.test import TestCase
 
 from djangoql.exceptions import DjangoQLSchemaError
 from djangoql.parser import DjangoQLParser
-from djangoql.schema import DjangoQLSchema, IntField
+from djangoql.schema import DjangoQLSchema, FloatField, IntField, StrField
 try:
     from django.core.urlresolvers import reverse
 except ImportError:  # Django 2.0
     from django.urls import reverse
 
 
+from ..admin import BookQLSchema
 from ..models import Book
 
 
@@ -116,11 +119,121 @@ class DjangoQLSuggestionsPaginationTest(TestCase):
         self.assertEqual(len(options["options"]),
                          author_username.suggest_options_page_size)
 
+    def test_filter_options(self):
+        custom = BookCustomFieldsSchema(Book)
+        model = custom.models['core.book']
+        name = model['name']
+        genre = model['genre']
+
+        options = name.get_paginated_options(search='harry')
+        expected = Book.objects.filter(name__icontains='harry')\
+            .order_by('name').values_list('name', flat=True)
+        self.assertTrue(expected)
+        self.assertListEqual(list(expected), options['options'])
+        self.assertFalse(options['has_more_options'])
+
+        options = genre.get_paginated_options(search='O')
+        self.assertListEqual(['Comics', 'Other'], options['options'])
+        genre = StrField(model=Book, name='genre', suggest_options=True)
+        genre.suggest_options_lookup = 'istartswith'
+        options = genre.get_paginated_options(search='O')
+        self.assertListEqual(['Other'], options['options'])
+
+    def test_get_options_page(self):
+        custom = BookCustomFieldsSchema(Book)
+        name = custom.models['core.book']['name']
+        genre = custom.models['core.book']['genre']
+        self.assertEqual('name', name.get_keyset_ordering(name.get_options()))
+        self.assertIsNone(genre.get_keyset_ordering(genre.get_options()))
+        for field in (name, genre):
+            options = []
+            cursor = None
+            while True:
+                with self.assertNumQueries(1 if field is name else 0):
+                    page = field.get_options_page(cursor=cursor)
+                options.extend(page['options'])
+                cursor = page['next_cursor']
+                if not cursor:
+                    break
+            self.assertListEqual(list(field.get_options()), options)
+
+        # Options which aren't ordered by the field are paginated by offset
+        ordered_by_id = Book.objects.order_by('id')\
+            .values_list('name', flat=True)
+        name = StrField(model=Book, name='name', suggest_options=True)
+        name.get_options = lambda: ordered_by_id
+        self.assertIsNone(name.get_keyset_ordering(ordered_by_id))
+        page1 = name.get_options_page()
+        page2 = name.get_options_page(cursor=page1['next_cursor'])
+        self.assertListEqual(
+            list(ordered_by_id[:2 * name.suggest_options_page_size]),
+            page1['options'] + page2['options'],
+        )
+
+    def test_options_page_without_null(self):
+        Book.objects.update(rating=None)
+        Book.objects.filter(pk__in=Book.objects.order_by('pk')[:2])\
+            .update(rating=4.5)
+        rating = FloatField(model=Book, name='rating', suggest_options=True)
+        self.assertIn(None, list(rating.get_options()))
+        pages = []
+        # Keyset and offset pages list the same options, without NULL
+        for limit in (None, 10):
+            rating.suggest_options_limit = limit
+            pages.append(rating.get_options_page())
+        self.assertListEqual([[4.5], [4.5]], [p['options'] for p in pages])
+        self.assertIsNone(pages[0]['next_cursor'])
+        self.assertIsNone(pages[1]['next_cursor'])
+
+    def test_options_ranking(self):
+        for i, name in enumerate(['b', 'a', 'c', 'b', 'c', 'b']):
+            User.objects.create(username='ranking%s' % i, first_name=name)
+        all_names = list(User.objects.values_list('first_name', flat=True))
+        field = StrField(model=User, name='first_name', suggest_options=True)
+        self.assertListEqual(sorted(set(all_names)), list(field.get_options()))
+
+        field.suggest_options_ranking = 'frequency'
+        counts = Counter(all_names)
+        expected = sorted(counts, key=lambda name: (-counts[name], name))
+        self.assertListEqual(expected, list(field.get_options()))
+        self.assertListEqual(
+            ['b', 'c', 'a'],
+            [n for n in field.get_options() if n in ('a', 'b', 'c')],
+        )
+
+        field.suggest_options_limit = 2
+        page = field.get_paginated_options()
+        self.assertListEqual(expected[:2], page['options'])
+        self.assertFalse(page['has_more_options'])
+        page = field.get_options_page()
+        self.assertListEqual(expected[:2], page['options'])
+        self.assertIsNone(page['next_cursor'])
+
     def test_get_fields(self):
         custom = BookCustomFieldsSchema(Book).as_dict()['models']['core.book']
         self.assertListEqual(list(custom.keys()), ['name', 'genre', 'author'])
 
 
+class OldStyleNameField(StrField):
+    model = Book
+    name = 'name'
+    suggest_options = True
+
+    def get_paginated_options(self, page_number):
+        return {
+            'has_more_options': False,
+            'next_options_page_number': None,
+            'options': ['page %s' % page_number],
+        }
+
+
+class OldStyleOptionsSchema(DjangoQLSchema):
+    def get_fields(self, model):
+        if model == Book:
+            return [OldStyleNameField()]
+        return super(OldStyleOptionsSchema, self).get_fields(model)
+
+
 class DjangoQLSuggestionsPaginationAdminTest(TestCase):
     fixtures = ["books_users.xml"]
 
@@ -183,3 +296,102 @@ class DjangoQLSuggestionsPaginationAdminTest(TestCase):
         sample_options = Book.objects.order_by(
             "name").values_list("name", flat=True)[75:100]
         self.assertListEqual(suggestions['options'], list(sample_options))
+
+    def test_filtered_suggestions(self):
+        url = reverse('admin:core_book_suggestions', kwargs={
+            "page": 1,
+            "field": "username",
+            "model": "auth.user"
+        })
+        self.assertTrue(self.client.login(**self.credentials))
+        response = self.client.get(url, {'search': 'rowling'})
+        self.assertEqual(200, response.status_code)
+        suggestions = json.loads(response.content.decode('utf8'))
+        self.assertFalse(suggestions['has_more_options'])
+        self.assertListEqual(
+            list(User.objects.filter(username__icontains='rowling')
+                 .order_by('username').values_list('username', flat=True)),
+            suggestions['options'],
+        )
+
+    def test_cursor_suggestions(self):
+        url = reverse('admin:core_book_suggestions', kwargs={
+            "field": "username",
+            "model": "auth.user"
+        })
+        self.assertTrue(self.client.login(**self.credentials))
+        options = []
+        cursor = None
+        while True:
+            params = {'cursor': cursor} if cursor else {}
+            response = self.client.get(url, params)
+            self.assertEqual(200, response.status_code)
+            suggestions = json.loads(response.content.decode('utf8'))
+            options.extend(suggestions['options'])
+            cursor = suggestions['next_cursor']
+            self.assertEqual(bool(cursor), suggestions['has_more_options'])
+            if not cursor:
+                break
+        self.assertListEqual(
+            list(User.objects.order_by('username')
+                 .values_list('username', flat=True)),
+            options,
+        )
+        response = self.client.get(url, {'cursor': 'foo'})
+        self.assertEqual(400, response.status_code)
+
+    def test_batch_suggestions(self):
+        url = reverse('admin:core_book_suggestions_batch')
+        batch = [
+            {'model': 'auth.user', 'field': 'username', 'search': 'rowling'},
+            {'model': 'core.book', 'field': 'name'},
+            {'model': 'auth.user', 'field': 'username'},
+            {'model': 'auth.user', 'field': 'foo'},
+            {'model': 'foo.bar', 'field': 'name'},
+            {'model': 'core.book', 'field': 'name', 'cursor': 'foo'},
+        ]
+        self.assertTrue(self.client.login(**self.credentials))
+        self.assertEqual(405, self.client.get(url).status_code)
+        response = self.client.post(
+            url,
+            json.dumps(batch),
+            content_type='application/json',
+        )
+        self.assertEqual(200, response.status_code)
+        results = json.loads(response.content.decode('utf8'))
+        self.assertEqual(len(batch), len(results))
+        for item, result in zip(batch[:3], results):
+            field = BookQLSchema(Book).models[item['model']][item['field']]
+            self.assertDictEqual(
+                field.get_options_page(search=item.get('search')),
+                result,
+            )
+        self.assertDictEqual({'error': 'No such field'}, results[3])
+        self.assertDictEqual({'error': 'Model not found'}, results[4])
+        self.assertIn('Invalid cursor', results[5]['error'])
+
+        response = self.client.post(url, '{}', content_type='application/json')
+        self.assertEqual(400, response.status_code)
+        response = self.client.post(
+            url,
+            json.dumps(batch * 10),
+            content_type='application/json',
+        )
+        self.assertEqual(400, response.status_code)
+
+    def test_old_style_paginated_options(self):
+        url = reverse('admin:core_book_suggestions', kwargs={
+            'page': 2,
+            'field': 'name',
+            'model': 'core.book',
+        })
+        model_admin = site._registry[Book]
+        model_admin.djangoql_schema = OldStyleOptionsSchema
+        self.assertTrue(self.client.login(**self.credentials))
+        try:
+            response = self.client.get(url)
+        finally:
+            del model_admin.djangoql_schema
+        self.assertEqual(200, response.status_code)
+        suggestions = json.loads(response.content.decode('utf8'))
+        self.assertListEqual(['page 2'], suggestions['options'])
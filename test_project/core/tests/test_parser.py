@@ -1,10 +1,17 @@
 # -*- coding: utf-8 -*-
+import os
+import random
+import subprocess
+import sys
+import threading
 import unittest.util
 from unittest import TestCase
 
-from djangoql.ast import Expression, Name, Comparison, Logical, Const, List
-from djangoql.exceptions import DjangoQLParserError
-from djangoql.parser import DjangoQLParser
+from djangoql.ast import (
+    Comparison, Const, Expression, List, Logical, LogicalExpression, Name,
+)
+from djangoql.exceptions import DjangoQLError, DjangoQLParserError
+from djangoql.parser import DjangoQLParser, get_parser
 
 
 # Show full contents in assertions when comparing long text strings
@@ -41,6 +48,26 @@ class DjangoQLParseTest(TestCase):
                        Const('none')),
             self.parser.parse('job.best.title > "none"')
         )
+        self.assertEqual(
+            Expression(Name('name'), Comparison('startswith'), Const('Gen')),
+            self.parser.parse('name startswith "Gen"')
+        )
+        self.assertEqual(
+            Expression(Name('name'), Comparison('not startswith'),
+                       Const('Gen')),
+            self.parser.parse('name not startswith "Gen"')
+        )
+        # "startswith" is a name unless it follows one
+        self.assertEqual(
+            Expression(Name('startswith'), Comparison('startswith'),
+                       Const('Gen')),
+            self.parser.parse('startswith startswith "Gen"')
+        )
+        self.assertEqual(
+            Expression(Name(['startswith', 'a']), Comparison('not in'),
+                       List([Const(1)])),
+            self.parser.parse('startswith.a not in (1)')
+        )
 
     def test_escaped_chars(self):
         self.assertEqual(
@@ -65,31 +92,62 @@ class DjangoQLParseTest(TestCase):
 
     def test_logical(self):
         self.assertEqual(
-            Expression(
+            LogicalExpression(Logical('and'), [
                 Expression(Name('age'), Comparison('>='), Const(18)),
-                Logical('and'),
                 Expression(Name('age'), Comparison('<='), Const(45)),
-            ),
+            ]),
             self.parser.parse('age >= 18 and age <= 45')
         )
         self.assertEqual(
-            Expression(
-                Expression(
+            LogicalExpression(Logical('or'), [
+                LogicalExpression(Logical('and'), [
                     Expression(Name('city'), Comparison('='), Const('Ivanovo')),
-                    Logical('and'),
                     Expression(Name('age'), Comparison('<='), Const(35)),
-                ),
-                Logical('or'),
-                Expression(
+                ]),
+                LogicalExpression(Logical('and'), [
                     Expression(Name('city'), Comparison('='), Const('Paris')),
-                    Logical('and'),
                     Expression(Name('age'), Comparison('<='), Const(45)),
-                ),
-            ),
+                ]),
+            ]),
             self.parser.parse('(city = "Ivanovo" and age <= 35) or '
                               '(city = "Paris" and age <= 45)')
         )
 
+    def test_logical_chain(self):
+        a, b, c, d = [
+            Expression(Name(n), Comparison('='), Const(1)) for n in 'abcd'
+        ]
+        self.assertEqual(
+            LogicalExpression(Logical('or'), [a, b, c, d]),
+            self.parser.parse('a = 1 or (b = 1 or c = 1) or d = 1'),
+        )
+        # Logical operators are right-associative
+        self.assertEqual(
+            LogicalExpression(Logical('and'), [
+                a,
+                b,
+                LogicalExpression(Logical('or'), [c, d]),
+            ]),
+            self.parser.parse('a = 1 and b = 1 and c = 1 or d = 1'),
+        )
+        self.assertEqual(
+            LogicalExpression(Logical('or'), [
+                LogicalExpression(Logical('and'), [a, b]),
+                LogicalExpression(Logical('and'), [c, d]),
+            ]),
+            self.parser.parse('(a = 1 and b = 1) or (c = 1 and d = 1)'),
+        )
+
+    def test_long_logical_chain(self):
+        query = ' or '.join(['id = %d' % i for i in range(5000)])
+        ast = self.parser.parse(query)
+        self.assertEqual(Logical('or'), ast.operator)
+        self.assertEqual(5000, len(ast.operands))
+        self.assertEqual(
+            Expression(Name('id'), Comparison('='), Const(4999)),
+            ast.operands[-1],
+        )
+
     def test_invalid_comparison(self):
         for expr in ('foo > None', 'b <= True', 'c in False', '1 = 1', 'a > b'):
             self.assertRaises(DjangoQLParserError, self.parser.parse, expr)
@@ -100,3 +158,138 @@ class DjangoQLParseTest(TestCase):
                        Const(5)),
             self.parser.parse('user.group.id = 5'),
         )
+
+
+class DjangoQLParserPoolTest(TestCase):
+    def test_same_thread(self):
+        self.assertIs(get_parser(), get_parser())
+
+    def test_other_threads(self):
+        parsers = []
+        errors = []
+
+        def parse():
+            parser = get_parser()
+            parsers.append(parser)
+            for i in range(50):
+                expected = Expression(Name('a'), Comparison('='), Const(i))
+                if parser.parse('a = %s' % i) != expected:
+                    errors.append(i)
+
+        threads = [threading.Thread(target=parse) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(4, len(set(id(p) for p in parsers)))
+        self.assertNotIn(get_parser(), parsers)
+        self.assertEqual([], errors)
+
+
+    def test_without_django_settings(self):
+        env = dict(os.environ)
+        env.pop('DJANGO_SETTINGS_MODULE', None)
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)
+        output = subprocess.check_output(
+            [
+                sys.executable, '-c',
+                'from djangoql.parser import get_parser; '
+                'print(get_parser().parse("a = 1"))',
+            ],
+            env=env,
+        )
+        self.assertIn(b'Expression', output)
+
+
+class DjangoQLDescentParseTest(DjangoQLParseTest):
+    parser = DjangoQLParser(engine='descent')
+
+
+class DjangoQLParserEnginesTest(TestCase):
+    """
+    Differential test: both parser engines must produce identical results
+    """
+    ply = DjangoQLParser()
+    descent = DjangoQLParser(engine='descent')
+
+    corpus = [
+        'age >= 18',
+        'gender = "female"',
+        'name != "Gennady"',
+        'married in (True, False)',
+        '(smile != None)',
+        'job.best.title > "none"',
+        'name startswith "a" or name not startswith "b"',
+        u'name ~ "Contains a \\"quoted\\" str, 年年有余"',
+        u'options = "\\u041f \\u0438 \\u0429"',
+        'pk > 5',
+        'rating <= 5.23e2',
+        'age >= 18 and age <= 45',
+        '(city = "Ivanovo" and age <= 35) or (city = "Paris" and age <= 45)',
+        'a = 1 or b = 2 and c = 3 or d = 4',
+        'a = 1 and (b = 2 or (c = 3 and (d not in (1, "x", None))))',
+        'user.group.id = 5',
+        'foo > None',
+        'b <= True',
+        'c in False',
+        '1 = 1',
+        'a > b',
+        '',
+        '()',
+        '(a = 1',
+        'a = 1)',
+        'a = 1 and',
+        'a = 1 and \n b b',
+        'a not 1',
+        'a in (1,)',
+        'a in ()',
+        'a ~ 1',
+        'a startswith 1',
+        'a not startswith',
+        'a startswith not "x"',
+        'startswith startswith "x"',
+        'startswith = 1 and a.startswith startswith "x"',
+        'startswith startswith startswith',
+        'a = 1 ^',
+        'a.b..c = 1',
+    ]
+
+    def result(self, parser, query):
+        try:
+            return str(parser.parse(query))
+        except DjangoQLError as e:
+            return type(e), str(e), e.value, e.line, e.column
+
+    def assert_same(self, query):
+        self.assertEqual(
+            self.result(self.ply, query),
+            self.result(self.descent, query),
+            'Parser engines disagree on %s' % repr(query),
+        )
+
+    def test_corpus(self):
+        for query in self.corpus:
+            self.assert_same(query)
+
+    def test_fuzz(self):
+        vocabulary = [
+            'a', 'b.c', '(', ')', '(', ')', ',', '=', '!=', '>', '>=', '<',
+            '<=', '~', '!~', 'in', 'not', 'startswith', 'and', 'or', 'True',
+            'False',
+            'None', '1', '-2.5', '3e2', '"x"', '"y\\"z"', '\n', '^',
+        ]
+        rnd = random.Random(42)
+        for _ in range(3000):
+            query = ' '.join(
+                rnd.choice(vocabulary) for _ in range(rnd.randint(0, 12))
+            )
+            self.assert_same(query)
+        # Mutations of valid queries reach deeper into the grammar
+        for _ in range(3000):
+            tokens = rnd.choice(self.corpus[:16]).split(' ')
+            i = rnd.randrange(len(tokens))
+            if rnd.random() < 0.5:
+                tokens[i] = rnd.choice(vocabulary)
+            else:
+                del tokens[i]
+            self.assert_same(' '.join(tokens))
@@ -0,0 +1,94 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.admin import site
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from djangoql.cache import introspection_cache
+from djangoql.parser import DjangoQLParser, parse_tables_are_current
+from djangoql.precompile import compiled_schema_name, load_compiled_schema
+
+from ..admin import BookQLSchema
+from .test_admin import UncachedSchema
+from ..models import Book
+
+try:
+    from django.core.urlresolvers import reverse
+except ImportError:  # Django 2.0
+    from django.urls import reverse
+
+
+class DjangoQLCompileTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.credentials = {'username': 'test', 'password': 'lol'}
+        User.objects.create_superuser(email='herp@derp.rr', **self.credentials)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_parse_tables(self):
+        self.assertTrue(parse_tables_are_current())
+        call_command('djangoql_compile', output=self.directory, check=True,
+                     verbosity=0)
+
+    def test_pickled_parse_tables(self):
+        path = os.path.join(self.directory, 'parsetab.pickle')
+        self.assertFalse(parse_tables_are_current(path))
+        call_command('djangoql_compile', output=self.directory,
+                     parse_tables=path, verbosity=0)
+        self.assertTrue(parse_tables_are_current(path))
+        call_command('djangoql_compile', output=self.directory,
+                     parse_tables=path, check=True, verbosity=0)
+        parser = DjangoQLParser(picklefile=path)
+        self.assertIsNotNone(parser.parse('name = "Ulysses"'))
+
+    def test_compile(self):
+        schema = BookQLSchema(Book)
+        self.assertIsNone(load_compiled_schema(schema))
+        call_command('djangoql_compile', output=self.directory, verbosity=0)
+        files = os.listdir(self.directory)
+        for compact in (False, True):
+            self.assertIn(compiled_schema_name(schema, compact), files)
+
+        with override_settings(DJANGOQL_COMPILED_DIR=self.directory):
+            path = os.path.join(self.directory, compiled_schema_name(schema))
+            with io.open(path, 'rb') as f:
+                content = f.read()
+            self.assertEqual(content, load_compiled_schema(schema))
+            self.assertTrue(self.client.login(**self.credentials))
+            url = reverse('admin:core_book_djangoql_introspect')
+            response = self.client.get(url)
+            self.assertEqual(200, response.status_code)
+            self.assertEqual(content, response.content)
+            # Precompiled schema is read once, only the session is loaded
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(content, response.content)
+
+    def test_compile_without_cache_key(self):
+        model_admin = site._registry[Book]
+        model_admin.djangoql_schema = UncachedSchema
+        schema = UncachedSchema(Book)
+        try:
+            call_command('djangoql_compile', output=self.directory,
+                         verbosity=0)
+            path = os.path.join(self.directory, compiled_schema_name(schema))
+            self.assertFalse(os.path.exists(path))
+            # Such schemas may differ between requests, so even a file with
+            # their name is not served
+            with io.open(path, 'wb') as f:
+                f.write(b'{}')
+            self.assertTrue(self.client.login(**self.credentials))
+            url = reverse('admin:core_book_djangoql_introspect')
+            with override_settings(DJANGOQL_COMPILED_DIR=self.directory):
+                response = self.client.get(url)
+            self.assertEqual(200, response.status_code)
+            self.assertNotEqual(b'{}', response.content)
+        finally:
+            del model_admin.djangoql_schema
+            introspection_cache.clear()
@@ -1,8 +1,14 @@
+from datetime import date, datetime
+
 from django.contrib.auth.models import User
+from django.db.models import Q
 from django.test import TestCase, override_settings
 
-from djangoql.queryset import apply_search
-from djangoql.schema import DjangoQLSchema, IntField
+from djangoql.parser import DjangoQLParser
+from djangoql.queryset import apply_search, needs_distinct
+from djangoql.schema import (
+    BoolField, DateField, DjangoQLSchema, IntField, StrField, parse_period,
+)
 
 from ..models import Book
 
@@ -15,6 +21,16 @@ class WrittenInYearField(IntField):
         return 'written__year'
 
 
+class LowercaseNameField(StrField):
+    model = Book
+    name = 'name'
+
+    def get_lookup_value(self, value):
+        if isinstance(value, list):
+            return [v.lower() for v in value]
+        return value.lower()
+
+
 class BookCustomSearchSchema(DjangoQLSchema):
     suggest_options = {
         Book: ['genre'],
@@ -23,10 +39,18 @@ class BookCustomSearchSchema(DjangoQLSchema):
     def get_fields(self, model):
         if model == Book:
             return [
-                'genre', WrittenInYearField(),
+                'genre', WrittenInYearField(), LowercaseNameField(),
             ]
 
 
+class SubquerySchema(DjangoQLSchema):
+    multivalued_lookups = 'subquery'
+
+
+class UnionSchema(DjangoQLSchema):
+    union_disjunctions = True
+
+
 class DjangoQLQuerySetTest(TestCase):
     def do_simple_query_test(self):
         qs = Book.objects.djangoql(
@@ -46,14 +70,83 @@ class DjangoQLQuerySetTest(TestCase):
     def test_simple_query_without_tz(self):
         self.do_simple_query_test()
 
+    @override_settings(USE_TZ=False)
     def test_datetime_like_query(self):
         qs = Book.objects.djangoql('written ~ "2017-01-30"')
         where_clause = str(qs.query).split('WHERE')[1].strip()
         self.assertEqual(
-            '"core_book"."written" LIKE %2017-01-30% ESCAPE \'\\\'',
+            '("core_book"."written" >= 2017-01-30 00:00:00 AND '
+            '"core_book"."written" < 2017-01-31 00:00:00)',
             where_clause,
         )
 
+    @override_settings(USE_TZ=False)
+    def test_partial_dates(self):
+        author = User.objects.create(username='author')
+        for written in ('2016-12-31 23:59:59', '2017-01-30 12:00:00',
+                        '2017-01-30 12:30:15', '2017-01-31 00:00:00',
+                        '2017-12-01 08:00:00'):
+            Book.objects.create(
+                name=written,
+                author=author,
+                written=datetime.strptime(written, '%Y-%m-%d %H:%M:%S'),
+            )
+        for search, count in (
+                ('written = "2017"', 4),
+                ('written ~ "2017"', 4),
+                ('written != "2017"', 1),
+                ('written = "2017-1"', 3),
+                ('written = "2017-12"', 1),
+                ('written = "2017-01-30"', 2),
+                ('written !~ "2017-01-30"', 3),
+                ('written = "2017-01-30 12"', 2),
+                ('written = "2017-01-30 12:30"', 0),
+                ('written ~ "2017-01-30 12:30"', 1),
+                ('written = "2017-01-30 12:30:15"', 1),
+                ('written in ("2016", "2017-12")', 2),
+                ('written not in ("2016", "2017-12")', 3),
+                ('written > "2017-01-30"', 4),
+                ('written < "2017"', 1),
+        ):
+            self.assertEqual(
+                count,
+                Book.objects.djangoql(search).count(),
+                search,
+            )
+
+    def test_partial_date_field(self):
+        field = DateField(model=Book, name='written')
+        self.assertEqual(
+            Q(written__gte=date(2017, 2, 1), written__lt=date(2017, 3, 1)),
+            field.get_lookup([], '=', '2017-02'),
+        )
+        self.assertEqual(
+            Q(written=date(2017, 2, 3)),
+            field.get_lookup([], '=', '2017-02-03'),
+        )
+        self.assertEqual(
+            Q(written__gte=date(9999, 1, 1)),
+            field.get_lookup([], '>=', '9999'),
+        )
+        self.assertEqual(
+            Q(written__gte=date(9999, 1, 1)),
+            field.get_lookup([], '=', '9999'),
+        )
+        self.assertEqual(
+            ~Q(written__gte=date(9999, 12, 1)),
+            field.get_lookup([], '!=', '9999-12'),
+        )
+        self.assertEqual(
+            Q(written=date(9999, 12, 31)),
+            field.get_lookup([], '=', '9999-12-31'),
+        )
+        self.assertEqual(
+            (datetime(2017, 12, 1), datetime(2018, 1, 1), 'month'),
+            parse_period('2017-12'),
+        )
+        self.assertIs(parse_period('2017-12'), parse_period('2017-12'))
+        self.assertRaises(ValueError, field.get_lookup_value, '2017-02-03 12')
+
     def test_apply_search(self):
         qs = User.objects.all()
         try:
@@ -86,7 +179,246 @@ class DjangoQLQuerySetTest(TestCase):
             where_clause.startswith('"core_book"."written" BETWEEN 2017-01-01')
         )
 
+    def test_custom_list_lookup_value(self):
+        qs = Book.objects.djangoql(
+            'name in ("Foo", "BAR")',
+            schema=BookCustomSearchSchema,
+        )
+        where_clause = str(qs.query).split('WHERE')[1].strip()
+        self.assertEqual('"core_book"."name" IN (foo, bar)', where_clause)
+
     def test_empty_datetime(self):
         qs = apply_search(User.objects.all(), 'last_login = None')
         where_clause = str(qs.query).split('WHERE')[1].strip()
         self.assertEqual('"auth_user"."last_login" IS NULL', where_clause)
+
+    def test_logical(self):
+        qs = Book.objects.djangoql(
+            'name = "a" or (name = "b" or name = "c") or '
+            '(is_published = True and price > 5)'
+        )
+        where_clause = str(qs.query).split('WHERE')[1].strip()
+        self.assertEqual(
+            '("core_book"."name" = a OR "core_book"."name" = b OR '
+            '"core_book"."name" = c OR ("core_book"."is_published" = True '
+            'AND "core_book"."price" > 5))',
+            where_clause,
+        )
+
+    def test_long_logical_chain(self):
+        search = ' or '.join(['id = %d' % i for i in range(5000)])
+        qs = Book.objects.djangoql(search)
+        q = qs.query.where.children[0]
+        self.assertEqual('OR', q.connector)
+        self.assertEqual(5000, len(q.children))
+
+    def test_large_in_list(self):
+        users = [User.objects.create(username='u%s' % i) for i in range(5)]
+        ids = [u.pk for u in users[:3]] + [10000 + i for i in range(10)]
+        names = ['u0', 'u1', 'u2'] + ['x%s' % i for i in range(10)]
+        searches = (
+            ('id in (%s)' % ', '.join(str(i) for i in ids), 3),
+            ('id not in (%s)' % ', '.join(str(i) for i in ids), 2),
+            ('username in (%s)' % ', '.join('"%s"' % n for n in names), 3),
+        )
+        for strategy in ('chunked', 'array'):
+            with override_settings(DJANGOQL_IN_LIST_STRATEGY=strategy,
+                                   DJANGOQL_IN_LIST_THRESHOLD=4):
+                for search, count in searches:
+                    qs = apply_search(User.objects.all(), search)
+                    self.assertEqual(count, qs.count(), (strategy, search))
+                    if strategy == 'array':
+                        self.assertIn('json_each', str(qs.query))
+
+    def test_array_in_list(self):
+        with override_settings(DJANGOQL_IN_LIST_STRATEGY='array',
+                               DJANGOQL_IN_LIST_THRESHOLD=2):
+            qs = apply_search(User.objects.all(), 'id in (1, 2, 3)')
+            where_clause = str(qs.query).split('WHERE')[1].strip()
+            self.assertEqual(
+                '"auth_user"."id" IN (SELECT value FROM json_each([1, 2, 3]))',
+                where_clause,
+            )
+            # Booleans are not passed in arrays, though they're ints
+            field = BoolField(model=User, name='is_staff')
+            expected = Q(Q(is_staff__in=[True, False]), Q(is_staff__in=[True]))
+            expected.connector = Q.OR
+            self.assertEqual(
+                expected,
+                field.get_in_list_lookup('is_staff', [True, False, True]),
+            )
+            # Values of fields which convert them, like dates, are not passed
+            # in arrays either
+            field = StrField(model=Book, name='written')
+            expected = Q(Q(written__in=['2017-01-01', '2017-01-02']),
+                         Q(written__in=['2017-01-03']))
+            expected.connector = Q.OR
+            self.assertEqual(
+                expected,
+                field.get_in_list_lookup(
+                    'written', ['2017-01-01', '2017-01-02', '2017-01-03'],
+                ),
+            )
+            self.assertFalse(WrittenInYearField().accepts_array())
+            self.assertTrue(IntField(model=Book, name='author').accepts_array())
+            self.assertTrue(StrField(model=User, name='email').accepts_array())
+
+    def test_chunked_in_list(self):
+        with override_settings(DJANGOQL_IN_LIST_STRATEGY='chunked',
+                               DJANGOQL_IN_LIST_THRESHOLD=2):
+            qs = apply_search(User.objects.all(), 'id in (1, 2, 3)')
+        where_clause = str(qs.query).split('WHERE')[1].strip()
+        self.assertEqual(
+            '("auth_user"."id" IN (1, 2) OR "auth_user"."id" IN (3))',
+            where_clause,
+        )
+
+    def test_multivalued_subqueries(self):
+        alice = User.objects.create(username='alice')
+        bob = User.objects.create(username='bob')
+        User.objects.create(username='carol')
+        for name, is_published in (('a', True), ('a', False), ('b', False)):
+            Book.objects.create(
+                name=name,
+                author=alice,
+                is_published=is_published,
+            )
+        Book.objects.create(name='b', author=bob, is_published=True)
+        searches = (
+            'book.name = "a"',
+            'book.name = "a" and book.is_published = False',
+            'book.name = "b" and book.is_published = True',
+            'book.name = "a" or book.name = "b"',
+            'book.name != "a"',
+            'book.name not in ("a", "b") or username = "bob"',
+            'book = None',
+            'book != None',
+            'book.similar_books = None',
+        )
+        for search in searches:
+            expected = list(
+                apply_search(User.objects.all(), search)
+                .distinct().order_by('pk').values_list('pk', flat=True)
+            )
+            qs = apply_search(User.objects.all(), search, SubquerySchema)
+            self.assertEqual(
+                expected,
+                list(qs.order_by('pk').values_list('pk', flat=True)),
+                search,
+            )
+            self.assertNotIn('JOIN', str(qs.query).split('WHERE')[0], search)
+        self.assertEqual(
+            4,
+            apply_search(User.objects.all(), 'book.name ~ ""').count(),
+        )
+        self.assertEqual(
+            2,
+            apply_search(User.objects.all(), 'book.name ~ ""', SubquerySchema)
+            .count(),
+        )
+
+    def test_multivalued_lookups_mode(self):
+        class WrongSchema(DjangoQLSchema):
+            multivalued_lookups = 'union'
+
+        with self.assertRaises(ValueError):
+            apply_search(User.objects.all(), 'groups = None', WrongSchema)
+
+    def test_needs_distinct(self):
+        schema_instance = DjangoQLSchema(User)
+        for search, expected in (
+                ('username = "a"', False),
+                ('book.author.username = "a"', True),
+                ('groups.name ~ "a" or username = "a"', True),
+                ('groups.name !~ "a"', False),
+        ):
+            ast = DjangoQLParser().parse(search)
+            self.assertEqual(
+                expected,
+                needs_distinct(ast, schema_instance),
+                search,
+            )
+            self.assertFalse(needs_distinct(ast, SubquerySchema(User)))
+
+    def test_union_disjunctions(self):
+        alice = User.objects.create(username='alice')
+        bob = User.objects.create(username='bob')
+        a = Book.objects.create(name='a', author=alice)
+        b = Book.objects.create(name='b', author=bob, is_published=True)
+        Book.objects.create(name='c', author=bob)
+        b.similar_books.add(a)
+        searches = (
+            ('author.username = "alice" or name = "c"', True),
+            ('author.username = "alice" or similar_books.name = "a" or '
+             'name = "c" or is_published = True', True),
+            ('(author.username = "bob" and name = "c") or name = "a"', True),
+            ('similar_books = None or author.username = "alice"', True),
+            ('name = "a" or is_published = True', False),
+            ('author.username = "bob" or author.username = "alice"', False),
+            ('author.username = "bob" and name = "c"', False),
+        )
+        for search, union in searches:
+            expected = set(
+                apply_search(Book.objects.all(), search)
+                .values_list('pk', flat=True)
+            )
+            qs = apply_search(Book.objects.all(), search, UnionSchema)
+            self.assertEqual(
+                expected,
+                set(qs.values_list('pk', flat=True)),
+                search,
+            )
+            self.assertEqual(union, 'UNION' in str(qs.query), search)
+            if union:
+                self.assertNotIn('JOIN', str(qs.query).split('WHERE')[0])
+
+    @override_settings(USE_TZ=False)
+    def test_startswith(self):
+        author = User.objects.create(username='author')
+        for name in ('McDonald', 'mcbride', 'Smith', 'Mc'):
+            Book.objects.create(
+                name=name,
+                author=author,
+                written=datetime(2017, 5, 1, 12),
+            )
+        self.assertEqual(
+            3,
+            Book.objects.djangoql('name startswith "mc"').count(),
+        )
+        self.assertEqual(
+            1,
+            Book.objects.djangoql('name not startswith "Mc"').count(),
+        )
+        for search, count in (
+                ('book.name startswith "Sm"', 1),
+                ('book.name not startswith "Sm"', 0),
+                ('book.name not startswith "x"', 1),
+        ):
+            self.assertEqual(
+                count,
+                apply_search(User.objects.all(), search, SubquerySchema)
+                .count(),
+                search,
+            )
+        self.assertEqual(
+            4,
+            Book.objects.djangoql('written startswith "2017-05"').count(),
+        )
+        self.assertEqual(
+            0,
+            Book.objects.djangoql('written startswith "2017-05-01 13"').count(),
+        )
+
+        class CaseSensitiveStrField(StrField):
+            startswith_lookup = 'startswith'
+
+        field = CaseSensitiveStrField(model=Book, name='name')
+        self.assertEqual(
+            Q(name__startswith='Mc'),
+            field.get_lookup([], 'startswith', 'Mc'),
+        )
+        self.assertEqual(
+            ~Q(author__username__istartswith='a'),
+            StrField(model=User, name='username')
+            .get_lookup(['author'], 'not startswith', 'a'),
+        )
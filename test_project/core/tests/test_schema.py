@@ -2,9 +2,13 @@ from django.apps import apps
 from django.contrib.auth.models import Group, User
 from django.test import TestCase
 
+from djangoql.cache import clear_introspection_cache
 from djangoql.exceptions import DjangoQLSchemaError
 from djangoql.parser import DjangoQLParser
-from djangoql.schema import DjangoQLSchema, IntField
+from djangoql.schema import (
+    COMPACT_HAS_MORE_OPTIONS, COMPACT_NULLABLE, DjangoQLField, DjangoQLSchema,
+    FloatField, IntField, RelationField, StrField,
+)
 
 from ..models import Book
 
@@ -29,6 +33,10 @@ class BookCustomFieldsSchema(DjangoQLSchema):
         return super(BookCustomFieldsSchema, self).get_fields(model)
 
 
+class BookSuggestNameSchema(DjangoQLSchema):
+    suggest_options = {Book: ['name']}
+
+
 class WrittenInYearField(IntField):
     model = Book
     name = 'written_in_year'
@@ -49,6 +57,9 @@ class DjangoQLSchemaTest(TestCase):
     def all_models(self):
         models = []
         for app_label in apps.app_configs:
+            if app_label == 'djangoql_suggestions':
+                # Optional app, its model is not related to others
+                continue
             models.extend(apps.get_app_config(app_label).get_models())
         return models
 
@@ -63,6 +74,66 @@ class DjangoQLSchemaTest(TestCase):
         self.assertEqual('sessions.session', session_model)
         self.assertListEqual(all_model_labels, sorted(models.keys()))
 
+    def test_as_dict_without_options(self):
+        schema = BookSuggestNameSchema(Book)
+        schema_dict = schema.as_dict()
+        with self.assertNumQueries(0):
+            structure = schema.as_dict(inline_options=False)
+        self.assertListEqual(
+            list(schema_dict['models']),
+            list(structure['models']),
+        )
+        name = structure['models']['core.book']['name']
+        self.assertListEqual([], name['options'])
+        self.assertTrue(name['has_more_options'])
+        author = structure['models']['core.book']['author']
+        self.assertEqual('auth.user', author['relation'])
+
+    def test_compact_schema(self):
+        Book.objects.create(
+            name='Dune',
+            author=User.objects.create(username='frank'),
+        )
+        schema = BookSuggestNameSchema(Book)
+        schema_dict = schema.as_dict()
+        compact = schema.as_compact_dict()
+        self.assertEqual('compact', compact['format'])
+        current_model = compact['labels'][compact['current_model']]
+        self.assertEqual('core.book', current_model)
+        # Decode it back the same way as completion.js does
+        models = {}
+        for label, fields in zip(compact['labels'], compact['models']):
+            models[label] = {}
+            for field in fields:
+                name, type_index, flags = field[:3]
+                decoded = {
+                    'type': compact['types'][type_index],
+                    'nullable': bool(flags & COMPACT_NULLABLE),
+                    'has_more_options': bool(flags & COMPACT_HAS_MORE_OPTIONS),
+                    'options': [],
+                }
+                for item in field[3:]:
+                    if isinstance(item, int):
+                        decoded['relation'] = compact['labels'][item]
+                    elif isinstance(item, list):
+                        decoded['options'] = item
+                    else:
+                        decoded.update(item)
+                models[label][name] = decoded
+        self.assertListEqual(list(schema_dict['models']), list(models))
+        for label, fields in schema_dict['models'].items():
+            for name, field in fields.items():
+                expected = {
+                    'type': field['type'],
+                    'nullable': field['nullable'],
+                    'has_more_options': field.get('has_more_options', False),
+                    'options': field['options'],
+                }
+                if 'relation' in field:
+                    expected['relation'] = field['relation']
+                self.assertDictEqual(expected, models[label][name])
+        self.assertListEqual(['Dune'], models['core.book']['name']['options'])
+
     def test_exclude(self):
         schema_dict = ExcludeUserSchema(Book).as_dict()
         self.assertEqual('core.book', schema_dict['current_model'])
@@ -140,6 +211,10 @@ class DjangoQLSchemaTest(TestCase):
             'date_joined > "1753-01-01"',
             'date_joined > "1753-01-01 01:24"',
             'date_joined > "1753-01-01 01:24:42"',
+            'date_joined > "1753"',
+            'date_joined > "1753-01"',
+            'date_joined < "1753-01-01 12"',
+            'date_joined in ("1753-1-1", "1754")',
         ]
         for query in samples:
             ast = DjangoQLParser().parse(query)
@@ -156,8 +231,10 @@ class DjangoQLSchemaTest(TestCase):
             'groups.name != 1',             # bad value type
             'is_staff = True and gav < 2',  # complex expression with valid part
             'date_joined < "1753-30-01"',   # bad timestamps
-            'date_joined < "1753-01-01 12"',
+            'date_joined < "1753-01-01 12:"',
             'date_joined < "1753-01-01 12AM"',
+            'date_joined < "17530101"',
+            'date_joined in ("1753", "1753-13")',
         ]
         for query in samples:
             ast = DjangoQLParser().parse(query)
@@ -166,3 +243,146 @@ class DjangoQLSchemaTest(TestCase):
                 self.fail('This query should\'t pass validation: %s' % query)
             except DjangoQLSchemaError as e:
                 pass
+
+    def test_introspection_cache(self):
+        models = DjangoQLSchema(Book).models
+        self.assertIs(models, DjangoQLSchema(Book).models)
+        self.assertIsNot(models, DjangoQLSchema(User).models)
+        self.assertIsNot(models, ExcludeUserSchema(Book).models)
+        clear_introspection_cache()
+        self.assertIsNot(models, DjangoQLSchema(Book).models)
+
+    def test_introspection_cache_disabled(self):
+        class NoCacheSchema(DjangoQLSchema):
+            cache_introspection = False
+
+        class UserKeySchema(DjangoQLSchema):
+            def get_introspection_cache_key(self):
+                return None
+
+        for schema in (NoCacheSchema, UserKeySchema):
+            models = schema(Book).models
+            self.assertEqual(list(models), list(schema(Book).models))
+            self.assertIsNot(models, schema(Book).models)
+
+    def test_introspection_cache_settings(self):
+        models = DjangoQLSchema(Book).models
+        with self.settings(USE_TZ=False):
+            self.assertIsNot(models, DjangoQLSchema(Book).models)
+
+    def test_lazy_introspection(self):
+        class TracingSchema(DjangoQLSchema):
+            cache_introspection = False
+
+            def get_fields(self, model):
+                introspected.append(model)
+                return super(TracingSchema, self).get_fields(model)
+
+        parser = DjangoQLParser()
+        introspected = []
+        schema = TracingSchema(Book)
+        schema.validate(parser.parse('name = "foo"'))
+        self.assertEqual([Book], introspected)
+        schema.validate(parser.parse('author.email = "foo"'))
+        self.assertEqual(Book, introspected[0])
+        self.assertIn(User, introspected)
+        self.assertLess(len(introspected), len(self.all_models()))
+        self.assertEqual(
+            DjangoQLSchema(Book).as_dict(),
+            schema.as_dict(),
+        )
+        self.assertEqual(len(schema.models), len(introspected))
+
+    def test_lazy_introspection_error(self):
+        class FlakySchema(DjangoQLSchema):
+            def get_fields(self, model):
+                if model is User and not failed:
+                    failed.append(model)
+                    raise RuntimeError('Database is gone')
+                return super(FlakySchema, self).get_fields(model)
+
+        failed = []
+        try:
+            self.assertIn('core.book', FlakySchema(Book).models)
+            with self.assertRaises(RuntimeError):
+                FlakySchema(Book).models['auth.user']
+            # The walk shared by all schema instances is restarted
+            self.assertIn('email', FlakySchema(Book).models['auth.user'])
+            self.assertEqual(
+                sorted(DjangoQLSchema(Book).models),
+                sorted(FlakySchema(Book).models),
+            )
+        finally:
+            clear_introspection_cache()
+
+    def test_lazy_introspection_disabled(self):
+        class EagerSchema(DjangoQLSchema):
+            lazy_introspection = False
+
+        class CustomIntrospectSchema(DjangoQLSchema):
+            def introspect(self, model, exclude=()):
+                return super(CustomIntrospectSchema, self).introspect(
+                    model,
+                    exclude,
+                )
+
+        for schema in (EagerSchema, CustomIntrospectSchema):
+            models = schema(Book).models
+            self.assertIsInstance(models, dict)
+            self.assertEqual(
+                sorted(models),
+                sorted(DjangoQLSchema(Book).models),
+            )
+
+    def test_string_options_detection(self):
+        class SuggestSchema(DjangoQLSchema):
+            cache_introspection = False
+            suggest_options = {Book: ['genre', 'rating', 'name']}
+
+            def get_field_cls(self, field):
+                if field.name == 'name':
+                    return DjangoQLField
+                return super(SuggestSchema, self).get_field_cls(field)
+
+        Book.objects.create(
+            name='foo',
+            author=User.objects.create(username='foo'),
+            rating=5,
+        )
+        # Only the field of unknown type is checked by a sample of options
+        with self.assertNumQueries(1):
+            fields = SuggestSchema(Book).models['core.book']
+        self.assertIsInstance(fields['genre'], StrField)
+        self.assertIsInstance(fields['rating'], FloatField)
+        self.assertIsInstance(fields['name'], StrField)
+
+    def test_choices_index(self):
+        field = DjangoQLSchema(Book).models['core.book']['genre']
+        index = field.get_choices_index()
+        self.assertIs(index, field.get_choices_index())
+        self.assertEqual(('Drama', 'Comics', 'Other'), index.labels)
+        self.assertEqual({'Drama': [1], 'Comics': [2], 'Other': [3]},
+                         index.values_by_label)
+        self.assertEqual({1: 'Drama', 2: 'Comics', 3: 'Other'},
+                         index.label_by_value)
+        self.assertEqual(2, field.get_lookup_value('Comics'))
+        self.assertEqual('Unknown', field.get_lookup_value('Unknown'))
+        self.assertEqual(
+            [2, 1],
+            field.get_lookup_value(('Comics', 'Drama', 'Comics', 'Unknown')),
+        )
+        self.assertIsNone(
+            DjangoQLSchema(Book).models['core.book']['name']
+            .get_choices_index()
+        )
+
+    def test_multivalued_relations(self):
+        self.assertFalse(RelationField(Book, 'author', User).multivalued)
+        self.assertTrue(RelationField(Book, 'similar_books', Book).multivalued)
+        self.assertTrue(RelationField(User, 'book', Book).multivalued)
+        # Custom relations which aren't model fields
+        self.assertTrue(RelationField(Book, 'reviewers', User).multivalued)
+        # Errors other than unknown fields are not hidden
+        self.assertRaises(
+            AttributeError, lambda: RelationField(None, 'a', User).multivalued,
+        )
@@ -0,0 +1,131 @@
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models.signals import pre_save
+from django.test import TestCase, modify_settings, override_settings
+
+from djangoql.contrib.suggestions.materialized import (
+    is_materialized, populate,
+)
+from djangoql.contrib.suggestions.models import SuggestionOption
+from djangoql.schema import BoolField, IntField, StrField
+
+from ..models import Book
+
+
+@override_settings(DJANGOQL_MATERIALIZED_SUGGESTIONS={
+    'auth.User': ['first_name'],
+})
+class MaterializedSuggestionsTest(TestCase):
+    def frequencies(self):
+        return dict(
+            SuggestionOption.objects
+            .filter(model='auth.user', field='first_name')
+            .values_list('value', 'frequency'),
+        )
+
+    def test_is_materialized(self):
+        self.assertTrue(is_materialized(User, 'first_name'))
+        self.assertFalse(is_materialized(User, 'last_name'))
+        with override_settings(DJANGOQL_MATERIALIZED_SUGGESTIONS=None):
+            self.assertFalse(is_materialized(User, 'first_name'))
+        with modify_settings(INSTALLED_APPS={
+                'remove': ['djangoql.contrib.suggestions']}):
+            self.assertFalse(is_materialized(User, 'first_name'))
+
+    def test_watched_models_only(self):
+        self.assertTrue(pre_save.has_listeners(User))
+        self.assertFalse(pre_save.has_listeners(Book))
+        with override_settings(DJANGOQL_MATERIALIZED_SUGGESTIONS=None):
+            self.assertFalse(pre_save.has_listeners(User))
+        self.assertTrue(pre_save.has_listeners(User))
+
+    def test_update_fields(self):
+        user = User.objects.create(username='a', first_name='Ann')
+        user.first_name = 'Bob'
+        user.save(update_fields=['last_name'])
+        self.assertDictEqual({'Ann': 1}, self.frequencies())
+        user.save(update_fields=['first_name'])
+        self.assertDictEqual({'Bob': 1}, self.frequencies())
+
+    @override_settings(DJANGOQL_MATERIALIZED_SUGGESTIONS={
+        'auth.User': ['first_name', 'id', 'is_staff'],
+    })
+    def test_non_string_fields(self):
+        self.assertFalse(is_materialized(User, 'id'))
+        self.assertFalse(is_materialized(User, 'is_staff'))
+        user = User.objects.create(username='a', first_name='Ann')
+        User.objects.create(username='b', is_staff=True)
+        # "Ann" and ""
+        self.assertEqual(2, populate(User))
+        self.assertSetEqual(
+            {'first_name'},
+            set(SuggestionOption.objects.values_list('field', flat=True)),
+        )
+        field = IntField(model=User, name='id', suggest_options=True)
+        self.assertIn(user.pk, list(field.get_options()))
+        field = BoolField(model=User, name='is_staff', suggest_options=True)
+        self.assertListEqual([False, True], list(field.get_options()))
+
+    def test_incremental_updates(self):
+        a = User.objects.create(username='a', first_name='Ann')
+        b = User.objects.create(username='b', first_name='Ann')
+        c = User.objects.create(username='c', first_name='Bob')
+        self.assertDictEqual({'Ann': 2, 'Bob': 1}, self.frequencies())
+
+        b.first_name = 'Bob'
+        b.save()
+        self.assertDictEqual({'Ann': 1, 'Bob': 2}, self.frequencies())
+        b.last_name = 'Smith'
+        b.save()
+        self.assertDictEqual({'Ann': 1, 'Bob': 2}, self.frequencies())
+
+        a.delete()
+        self.assertDictEqual({'Bob': 2}, self.frequencies())
+        c.first_name = ''
+        c.save()
+        self.assertDictEqual({'': 1, 'Bob': 1}, self.frequencies())
+
+    def test_populate(self):
+        for i, name in enumerate(['b', 'a', 'c', 'b', 'c', 'b']):
+            User.objects.create(username='populate%s' % i, first_name=name)
+        expected = self.frequencies()
+        SuggestionOption.objects.all().delete()
+        # Bulk updates don't send signals
+        User.objects.filter(first_name='a').update(first_name='d')
+        expected['d'] = expected.pop('a')
+        self.assertEqual(3, populate(User))
+        self.assertDictEqual(expected, self.frequencies())
+
+        SuggestionOption.objects.all().delete()
+        call_command('djangoql_populate_suggestions', 'auth.User', verbosity=0)
+        self.assertDictEqual(expected, self.frequencies())
+
+    def test_options(self):
+        names = ['b', 'a', 'c', 'b', 'c', 'b']
+        for i, name in enumerate(names):
+            User.objects.create(username='options%s' % i, first_name=name)
+        field = StrField(model=User, name='first_name', suggest_options=True)
+        self.assertListEqual(['a', 'b', 'c'], list(field.get_options()))
+        self.assertEqual('value', field.get_keyset_ordering(field.get_options()))
+        page = field.get_options_page(search='B')
+        self.assertListEqual(['b'], page['options'])
+
+        field.suggest_options_page_size = 1
+        options = []
+        cursor = None
+        while True:
+            page = field.get_options_page(cursor=cursor)
+            options.extend(page['options'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertListEqual(['a', 'b', 'c'], options)
+
+        field.suggest_options_ranking = 'frequency'
+        counts = Counter(names)
+        self.assertListEqual(
+            sorted(counts, key=lambda name: (-counts[name], name)),
+            list(field.get_options()),
+        )
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     'djangoql',
+    'djangoql.contrib.suggestions',
 
     'core',
 ]